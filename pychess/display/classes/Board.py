@@ -4,9 +4,10 @@ from display.classes.Square import Square
 from display.classes.Piece import Piece
 
 from logic.chess_logic import ChessLogic
+from logic.worker import GameWorker, GameState
 
 class Board:
-    def __init__(self, width: int, height: int, logic: ChessLogic):
+    def __init__(self, width: int, height: int, logic: ChessLogic, worker: GameWorker | None = None):
         """
         Object representing the Chess Board
 
@@ -15,6 +16,8 @@ class Board:
             height (int): The height of the Chess Board
             logic (ChessLogic): ChessLogic object which implements the Chess Game Logic 
                 (i.e. Board Representation, Move Making Logic)
+            worker (GameWorker | None): worker thread running the logic. When given, moves are submitted to it
+                and the board is drawn from the states it posts, so the logic never runs on the UI thread
         """
         self.width = width
         self.height = height
@@ -23,8 +26,17 @@ class Board:
         self.selected_piece = None
 
         self.logic = logic
+        self.worker = worker
+        # the position being drawn, taken from the logic before the worker starts and from the worker afterwards
+        self.state = GameState.of(logic)
         self.squares: list[Square] = self.generate_squares()
 
+        # the 64 empty tiles pre-rendered once, and the position and result last drawn on the screen
+        # (None until the first frame), so that draw only repaints the squares that changed
+        self.background: pygame.Surface | None = None
+        self.rendered: list[list[str]] | None = None
+        self.rendered_result = ""
+
         self.start_pos = ""
         self.end_pos = ""
 
@@ -33,11 +45,12 @@ class Board:
         Construct all Square Objects of the Chess Board and place pieces based on the ChessLogic Board Representation
         """
         output = []
+        board = self.state.board
         for y in range(8):
             for x in range(8):
                 piece = None
-                if self.logic.board[y][x] != "":
-                    piece = Piece(self.logic.board[y][x], self.tile_width, self.tile_height)
+                if board[y][x] != "":
+                    piece = Piece(board[y][x], self.tile_width, self.tile_height)
                 square = Square(x, y, self.tile_width, self.tile_height)
                 square.set_occuping_piece(piece)
                 output.append(square)
@@ -76,40 +89,106 @@ class Board:
             elif self.end_pos == "":
                 self.end_pos = clicked_square.get_coord()
                 if self.start_pos != self.end_pos:
-                    self.logic.play_move(f"{self.start_pos}{self.end_pos}")
+                    move = f"{self.start_pos}{self.end_pos}"
+                    if self.worker is not None:
+                        self.worker.submit_move(move)
+                    else:
+                        notation = self.logic.play_move(move)
+                        self.state = GameState.of(self.logic, move, notation)
                 self.start_pos = ""
                 self.end_pos = ""
     
-    def draw(self, display, font):
+    def update(self):
+        """
+        Take the latest state posted by the worker, if any. Never blocks
+        """
+        if self.worker is not None:
+            states = self.worker.poll()
+            if states:
+                self.state = states[-1]
+
+    def render_background(self) -> pygame.Surface:
+        """
+        Draw the 64 tiles without pieces onto a surface of the board size
+        """
+        background = pygame.Surface((self.width, self.height))
+        background.fill("white")
+        for y in range(8):
+            for x in range(8):
+                Square(x, y, self.tile_width, self.tile_height).draw(background)
+        return background
+
+    def invalidate(self):
+        """
+        Repaint the whole board on the next draw, i.e. after the window was covered
+        """
+        self.rendered = None
+        self.rendered_result = ""
+
+    def draw(self, display, font) -> list[pygame.Rect]:
         """
-        Draws the Board, with result message if applicable, on Pygame Screen
+        Draws the Board, with result message if applicable, on Pygame Screen. Only the squares whose piece
+        changed since the last call are repainted, from the static background
 
         Args:
             display: Pygame Screen Object
             font: Pygame Font Object
+
+        Returns:
+            list[pygame.Rect]: The areas of the screen that changed, to pass to pygame.display.update.
+            Empty when nothing changed
         """
-        self.squares = self.generate_squares()
+        self.update()
+        if self.background is None:
+            self.background = self.render_background()
+        board = self.state.board
+        dirty = []
+        if self.rendered is None:
+            display.blit(self.background, (0, 0))
+            dirty.append(pygame.Rect(0, 0, self.width, self.height))
         for square in self.squares:
-            square.draw(display)
-        if self.logic.result != "":
-            white = (255, 255, 255)
-            black = (0, 0, 0)
-            red = (255, 0, 0)
-            gray = (200, 200, 200)
-
-            message = "Draw"
-            if self.logic.result == "w":
-                message = "White wins"
-            elif self.logic.result == "b":
-                message = "Black wins"
-            text_surface = font.render(message, True, white)
-            text_rect = text_surface.get_rect(center=(self.width // 2, self.height // 2))
-            rect_width = text_rect.width + 40
-            rect_height = text_rect.height + 20
-            rect_x = text_rect.x - 20
-            rect_y = text_rect.y - 10
-
-            pygame.draw.rect(display, gray, (rect_x, rect_y, rect_width, rect_height))
-            pygame.draw.rect(display, red, (rect_x, rect_y, rect_width, rect_height), 3)
-
-            display.blit(text_surface, text_rect)
\ No newline at end of file
+            piece = board[square.y][square.x]
+            if self.rendered is not None and self.rendered[square.y][square.x] == piece:
+                continue
+            square.set_occuping_piece(Piece(piece, self.tile_width, self.tile_height) if piece != "" else None)
+            display.blit(self.background, square.rect, square.rect)
+            square.draw_piece(display)
+            if self.rendered is not None:
+                dirty.append(square.rect)
+        self.rendered = [list(row) for row in board]
+
+        result = self.state.result
+        if result != "" and result != self.rendered_result:
+            self.rendered_result = result
+            dirty.append(self.draw_result(display, font, result))
+        return dirty
+
+    def draw_result(self, display, font, result: str) -> pygame.Rect:
+        """
+        Draws the result message over the middle of the board
+
+        Returns:
+            pygame.Rect: The area drawn on
+        """
+        white = (255, 255, 255)
+        black = (0, 0, 0)
+        red = (255, 0, 0)
+        gray = (200, 200, 200)
+
+        message = "Draw"
+        if result == "w":
+            message = "White wins"
+        elif result == "b":
+            message = "Black wins"
+        text_surface = font.render(message, True, white)
+        text_rect = text_surface.get_rect(center=(self.width // 2, self.height // 2))
+        rect_width = text_rect.width + 40
+        rect_height = text_rect.height + 20
+        rect_x = text_rect.x - 20
+        rect_y = text_rect.y - 10
+
+        pygame.draw.rect(display, gray, (rect_x, rect_y, rect_width, rect_height))
+        pygame.draw.rect(display, red, (rect_x, rect_y, rect_width, rect_height), 3)
+
+        display.blit(text_surface, text_rect)
+        return pygame.Rect(rect_x, rect_y, rect_width, rect_height)
\ No newline at end of file
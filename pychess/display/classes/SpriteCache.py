@@ -0,0 +1,83 @@
+import pygame
+import os
+
+# order of the pieces in the atlas, by FEN character
+ATLAS_ORDER = "PNBRQKpnbrqk"
+PIECE_NAMES = {
+    "p": "pawn",
+    "r": "rook",
+    "n": "knight",
+    "b": "bishop",
+    "q": "queen",
+    "k": "king"
+}
+# the source images are 1237x928, cells are shrunk to this height on load so the atlas stays a few MB.
+# Sprites are at most a board tile, so this is still sharp on boards up to 2048 pixels
+ATLAS_CELL_HEIGHT = 256
+
+class SpriteCache:
+    def __init__(self, image_dir: str = "display/imgs/"):
+        """
+        Piece images loaded from disk once, side by side in a single atlas surface, with the scaled
+        sprites kept per size so that building Piece objects costs no I/O and no scaling after the
+        first frame
+
+        Args:
+            image_dir (str): directory holding the twelve {color}_{piece}.png images
+        """
+        self.image_dir = image_dir
+        self.atlas: pygame.Surface | None = None
+        self.cell_size = (0, 0)
+        # (width, height) -> FEN character -> sprite, subsurfaces of one scaled copy of the atlas
+        self.sprites: dict[tuple[int, int], dict[str, pygame.Surface]] = {}
+
+    def load(self):
+        """
+        Load the twelve images into the atlas, done on first use
+        """
+        images = []
+        for fen_notation in ATLAS_ORDER:
+            color = "b" if fen_notation.islower() else "w"
+            path = os.path.join(self.image_dir, f"{color}_{PIECE_NAMES[fen_notation.lower()]}.png")
+            images.append(pygame.image.load(path))
+
+        width, height = images[0].get_size()
+        cell_width = max(1, width * ATLAS_CELL_HEIGHT // height)
+        self.cell_size = (cell_width, ATLAS_CELL_HEIGHT)
+        self.atlas = pygame.Surface((cell_width * len(images), ATLAS_CELL_HEIGHT), pygame.SRCALPHA)
+        for i, image in enumerate(images):
+            # copied onto a 32 bit surface first, smoothscale does not take palette images
+            cell = pygame.Surface(image.get_size(), pygame.SRCALPHA)
+            cell.blit(image, (0, 0))
+            self.atlas.blit(pygame.transform.smoothscale(cell, self.cell_size), (i * cell_width, 0))
+
+    def sprite(self, fen_notation: str, width: int, height: int) -> pygame.Surface:
+        """
+        Get the image of a piece at a given size
+
+        Args:
+            fen_notation (str): Fen Notation for piece i.e. R -> white rook, r -> black rook
+            width (int): Width of the sprite
+            height (int): Height of the sprite
+
+        Returns:
+            pygame.Surface: The sprite, shared by every piece of that kind and size, so it must not be drawn on
+        """
+        sprites = self.sprites.get((width, height))
+        if sprites is None:
+            if self.atlas is None:
+                self.load()
+            # the whole atlas is scaled at once, every sprite of the size is a view into it
+            scaled = pygame.transform.smoothscale(self.atlas, (width * len(ATLAS_ORDER), height))
+            sprites = {piece: scaled.subsurface((i * width, 0, width, height)) for i, piece in enumerate(ATLAS_ORDER)}
+            self.sprites[(width, height)] = sprites
+        return sprites[fen_notation]
+
+    def clear(self):
+        """
+        Drop the scaled sprites, i.e. after the window is resized, the atlas is kept
+        """
+        self.sprites.clear()
+
+# shared by every Piece
+SPRITES = SpriteCache()
@@ -65,7 +65,15 @@ class Square:
             pygame.draw.rect(display, self.highlight_color, self.rect)
         else:
             pygame.draw.rect(display, self.draw_color, self.rect)
-        
+        self.draw_piece(display)
+
+    def draw_piece(self, display):
+        """
+        Draw only the occupying Piece, if any, centered on the Square
+
+        Args:
+            display: Pygame Screen Object
+        """
         if self.occupying_piece != None:
             centering_rect = self.occupying_piece.img.get_rect()
             centering_rect.center = self.rect.center
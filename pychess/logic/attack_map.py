@@ -0,0 +1,121 @@
+from .board_utils import str2index
+from .tables import KNIGHT_TARGETS, KING_TARGETS, PAWN_ATTACKS, RAYS
+
+# index of the opposite direction in QUEEN_DIRECTIONS
+OPPOSITE = (1, 0, 3, 2, 7, 6, 5, 4)
+# sliders moving along the rook directions (indices 0 to 3) and the bishop directions (4 to 7)
+ROOK_SLIDERS = frozenset("RQrq")
+BISHOP_SLIDERS = frozenset("BQbq")
+
+
+class AttackMap:
+    def __init__(self, board):
+        """
+        Number of pieces of each side attacking every square, kept up to date as pieces are removed and placed.
+        counts[0] holds the white attackers and counts[1] the black ones, indexed by square (row * 8 + col).
+        Pieces must be moved on the board with remove, place and replace, which also write the board
+
+        Args:
+            board: board to count the attacks on, list of lists or Bitboard
+        """
+        self.counts = ([0] * 64, [0] * 64)
+        for row in range(8):
+            for col in range(8):
+                if board[row][col] != '':
+                    self._add_attacks(board, row * 8 + col, board[row][col], 1)
+
+    def attacked(self, square: int, by_white: bool) -> bool:
+        """
+        Args:
+            square (int): square index (row * 8 + col)
+            by_white (bool): True for the white attackers, False for the black ones
+
+        Returns:
+            bool: True if a piece of that color attacks the square
+        """
+        return self.counts[0 if by_white else 1][square] != 0
+
+    def is_square_attacked(self, square, color) -> bool:
+        """
+        Same as board_utils.is_square_attacked, answered by lookup
+
+        Args:
+            square (str) or (tuple) or (int): The square to check (e.g., "e1", (1, 1), 60).
+            color (str): The color of the player ("w" or "b").
+
+        Returns:
+            bool: True if the square is attacked by the opponent, False otherwise.
+        """
+        if not isinstance(square, int):
+            row, col = str2index(square)
+            square = row * 8 + col
+        return self.counts[1 if color == 'w' else 0][square] != 0
+
+    def remove(self, board, square: int):
+        """
+        Take the piece off a square, the sliders it blocked now attack beyond it
+        """
+        row, col = square >> 3, square & 7
+        piece = board[row][col]
+        board[row][col] = ''
+        self._add_attacks(board, square, piece, -1)
+        if self.counts[0][square] or self.counts[1][square]:
+            self._through(board, square, 1)
+
+    def place(self, board, square: int, piece: str):
+        """
+        Put a piece on an empty square, it now blocks the sliders attacking through it
+        """
+        if self.counts[0][square] or self.counts[1][square]:
+            self._through(board, square, -1)
+        board[square >> 3][square & 7] = piece
+        self._add_attacks(board, square, piece, 1)
+
+    def replace(self, board, square: int, piece: str):
+        """
+        Put a piece on an occupied square (a capture), the square stays blocked so no ray changes
+        """
+        row, col = square >> 3, square & 7
+        self._add_attacks(board, square, board[row][col], -1)
+        board[row][col] = piece
+        self._add_attacks(board, square, piece, 1)
+
+    def _add_attacks(self, board, square, piece, delta):
+        counts = self.counts[0 if piece.isupper() else 1]
+        kind = piece.lower()
+        if kind == 'p':
+            targets = PAWN_ATTACKS['w' if piece == 'P' else 'b'][square]
+        elif kind == 'n':
+            targets = KNIGHT_TARGETS[square]
+        elif kind == 'k':
+            targets = KING_TARGETS[square]
+        else:
+            rays = RAYS[square]
+            directions = range(4) if kind == 'r' else range(4, 8) if kind == 'b' else range(8)
+            for i in directions:
+                for row, col in rays[i]:
+                    counts[row * 8 + col] += delta
+                    if board[row][col] != '':
+                        break
+            return
+        for row, col in targets:
+            counts[row * 8 + col] += delta
+
+    def _through(self, board, square, delta):
+        """
+        Extend (delta 1) or cut (delta -1) the rays of the sliders reaching the empty square beyond it.
+        Only called when the square is attacked at all, as otherwise no slider reaches it
+        """
+        rays = RAYS[square]
+        for i in range(8):
+            for row, col in rays[i]:
+                piece = board[row][col]
+                if piece == '':
+                    continue
+                if piece in (ROOK_SLIDERS if i < 4 else BISHOP_SLIDERS):
+                    counts = self.counts[0 if piece.isupper() else 1]
+                    for beyond_row, beyond_col in rays[OPPOSITE[i]]:
+                        counts[beyond_row * 8 + beyond_col] += delta
+                        if board[beyond_row][beyond_col] != '':
+                            break
+                break
@@ -0,0 +1,382 @@
+from .board_utils import str2index, PROMOTION_FLAGS
+from .tables import KNIGHT_MASKS, KING_MASKS, PAWN_ATTACK_MASKS, RAY_MASKS, RANK_MASKS, BETWEEN, FULL_MASK
+
+# Squares are indexed row * 8 + col like the rest of the logic, so bit 0 is a8 and bit 63 is h1
+PIECES = "PNBRQKpnbrqk"
+PIECE_INDEX = {piece: i for i, piece in enumerate(PIECES)}
+WHITE, BLACK = 0, 1
+
+KNIGHT_ATTACKS = KNIGHT_MASKS
+KING_ATTACKS = KING_MASKS
+PAWN_ATTACKS = PAWN_ATTACK_MASKS
+
+
+def _line_fill(col: int, occupied: int) -> int:
+    """
+    Columns reached from col along one line of eight squares whose occupancy is given as a byte,
+    stopping at (and including) the first blocker on each side
+    """
+    fill = 0
+    for step in (1, -1):
+        c = col + step
+        while 0 <= c < 8:
+            fill |= 1 << c
+            if occupied >> c & 1:
+                break
+            c += step
+    return fill
+
+
+# Sliding attacks are looked up by line: the occupancy of the rank, file or diagonal through the square is
+# gathered into a byte, LINE_ATTACKS gives the attacked positions on that line and they are spread back
+# onto the board. LINE_ATTACKS[i][byte] is indexed by the position of the square on the line
+LINE_ATTACKS = [[_line_fill(i, occupied) for occupied in range(256)] for i in range(8)]
+# multiplying a mask with at most one square per column by COLLECT moves column c into bit 56 + c, and a byte
+# times COLLECT repeats it on every row
+COLLECT = 0x0101010101010101
+# multiplying the a file by FILE_COLLECT moves row r into bit 56 + r
+FILE_COLLECT = 0x0102040810204080
+FILE_A = sum(1 << (8 * row) for row in range(8))
+# pawns that can capture towards the a and the h file
+NOT_FILE_A = FULL_MASK ^ FILE_A
+NOT_FILE_H = FULL_MASK ^ (FILE_A << 7)
+# bit r of the byte to the square of row r on the a file
+BYTE_TO_FILE = [sum(1 << (8 * row) for row in range(8) if occupied >> row & 1) for occupied in range(256)]
+# the two diagonals through every square, without the square itself
+DIAGONALS = [RAY_MASKS[4][square] | RAY_MASKS[7][square] for square in range(64)]
+ANTI_DIAGONALS = [RAY_MASKS[5][square] | RAY_MASKS[6][square] for square in range(64)]
+# every square a rook or bishop on the square could reach on an empty board
+ROOK_LINES = [RAY_MASKS[0][square] | RAY_MASKS[1][square] | RAY_MASKS[2][square] | RAY_MASKS[3][square]
+              for square in range(64)]
+BISHOP_LINES = [DIAGONALS[square] | ANTI_DIAGONALS[square] for square in range(64)]
+
+
+def rook_attacks(square: int, occupied: int) -> int:
+    rank = square & 56
+    col = square & 7
+    attacks = LINE_ATTACKS[col][occupied >> rank & 255] << rank
+    file = ((occupied >> col) & FILE_A) * FILE_COLLECT >> 56 & 255
+    return attacks | BYTE_TO_FILE[LINE_ATTACKS[square >> 3][file]] << col
+
+
+def bishop_attacks(square: int, occupied: int) -> int:
+    line = LINE_ATTACKS[square & 7]
+    diagonal = DIAGONALS[square]
+    anti_diagonal = ANTI_DIAGONALS[square]
+    return (line[(occupied & diagonal) * COLLECT >> 56 & 255] * COLLECT & diagonal) | \
+        (line[(occupied & anti_diagonal) * COLLECT >> 56 & 255] * COLLECT & anti_diagonal)
+
+
+class BitboardRow(list):
+    def __init__(self, bitboard, row: int):
+        """
+        One row of a Bitboard. Reads are plain list reads, writes (board[row][col] = piece) go through
+        Bitboard.set_piece so the bitboards stay in step
+        """
+        super().__init__([''] * 8)
+        self.bitboard = bitboard
+        self.row = row
+
+    def __setitem__(self, col, piece):
+        self.bitboard.set_piece(self.row * 8 + col, piece)
+
+
+class Bitboard(list):
+    def __init__(self, rows=None):
+        """
+        Board backend storing the position as twelve 64 bit integers, one per piece type and color.
+        The board itself is a list of eight rows holding the same one character strings as the list of
+        lists board, so board[row][col] reads cost a list lookup on either backend and it can be used
+        anywhere the list board is, while attack and move queries are done with integer operations on
+        precomputed tables
+
+        Args:
+            rows: optional list of lists board to copy the position from
+        """
+        super().__init__(BitboardRow(self, row) for row in range(8))
+        self.pieces = [0] * 12
+        self.colors = [0, 0]
+        self.occupied = 0
+        if rows is not None:
+            for row in range(8):
+                for col in range(8):
+                    if rows[row][col] != '':
+                        self.set_piece(row * 8 + col, rows[row][col])
+
+    def __repr__(self):
+        return f"Bitboard({self.to_rows()!r})"
+
+    def to_rows(self) -> list[list[str]]:
+        """
+        Returns:
+            list[list[str]]: The position as a list of lists board
+        """
+        return [list(row) for row in self]
+
+    def piece_at(self, square: int) -> str:
+        """
+        Args:
+            square (int): square index (row * 8 + col)
+        Returns:
+            str: The piece on the square, '' if empty
+        """
+        return self[square >> 3][square & 7]
+
+    def set_piece(self, square: int, piece: str):
+        """
+        Put a piece on a square, replacing whatever was there
+
+        Args:
+            square (int): square index (row * 8 + col)
+            piece (str): the piece to put, '' to clear the square
+        """
+        bit = 1 << square
+        row = self[square >> 3]
+        old = row[square & 7]
+        if old != '':
+            clear = ~bit
+            index = PIECE_INDEX[old]
+            self.pieces[index] &= clear
+            self.colors[WHITE if index < 6 else BLACK] &= clear
+            self.occupied &= clear
+        if piece != '':
+            index = PIECE_INDEX[piece]
+            self.pieces[index] |= bit
+            self.colors[WHITE if index < 6 else BLACK] |= bit
+            self.occupied |= bit
+        list.__setitem__(row, square & 7, piece)
+
+    def attackers(self, square: int, by_white: bool, occupied=None) -> int:
+        """
+        Args:
+            square (int): square index
+            by_white (bool): True for the white attackers, False for the black ones
+            occupied: occupancy to use for the sliding pieces, defaults to the current one
+
+        Returns:
+            int: Mask of the pieces of that color attacking the square
+        """
+        if occupied is None:
+            occupied = self.occupied
+        pieces = self.pieces
+        base = 0 if by_white else 6
+        # a pawn of the other color on the square would attack exactly the attacking pawns
+        attackers = PAWN_ATTACKS[BLACK if by_white else WHITE][square] & pieces[base]
+        attackers |= KNIGHT_ATTACKS[square] & pieces[base + 1]
+        attackers |= KING_ATTACKS[square] & pieces[base + 5]
+        queens = pieces[base + 4]
+        # the slider lookups are skipped when no slider stands on a line through the square
+        bishops = (pieces[base + 2] | queens) & BISHOP_LINES[square]
+        if bishops:
+            attackers |= bishop_attacks(square, occupied) & bishops
+        rooks = (pieces[base + 3] | queens) & ROOK_LINES[square]
+        if rooks:
+            attackers |= rook_attacks(square, occupied) & rooks
+        return attackers
+
+    def is_square_attacked(self, square, color) -> bool:
+        """
+        Same as board_utils.is_square_attacked
+
+        Args:
+            square (str) or (tuple) or (int): The square to check (e.g., "e1", (1, 1), 60).
+            color (str): The color of the player ("w" or "b").
+
+        Returns:
+            bool: True if the square is attacked by the opponent, False otherwise.
+        """
+        if not isinstance(square, int):
+            row, col = str2index(square)
+            square = row * 8 + col
+        return self.attacked(square, color == 'b')
+
+    def attacked(self, square: int, by_white: bool, occupied=None) -> bool:
+        """
+        Same as AttackMap.attacked, the bitboard computes attacks fast enough to stand in for an attack map.
+        Unlike attackers it stops at the first attacker found
+
+        Args:
+            square (int): square index
+            by_white (bool): True for the white attackers, False for the black ones
+            occupied: occupancy to use for the sliding pieces, defaults to the current one
+        """
+        pieces = self.pieces
+        base = 0 if by_white else 6
+        if PAWN_ATTACKS[BLACK if by_white else WHITE][square] & pieces[base] or \
+                KNIGHT_ATTACKS[square] & pieces[base + 1] or KING_ATTACKS[square] & pieces[base + 5]:
+            return True
+        # a slider on a line through the square attacks it when nothing stands in between
+        queens = pieces[base + 4]
+        sliders = ((pieces[base + 3] | queens) & ROOK_LINES[square]) | \
+            ((pieces[base + 2] | queens) & BISHOP_LINES[square])
+        if sliders:
+            if occupied is None:
+                occupied = self.occupied
+            between = BETWEEN[square]
+            while sliders:
+                bit = sliders & -sliders
+                if not between[bit.bit_length() - 1] & occupied:
+                    return True
+                sliders ^= bit
+        return False
+
+    def remove(self, board, square: int):
+        """
+        AttackMap interface, take the piece off a square
+        """
+        self.set_piece(square, '')
+
+    def place(self, board, square: int, piece: str):
+        """
+        AttackMap interface, put a piece on a square
+        """
+        self.set_piece(square, piece)
+
+    replace = place
+
+    def check_and_pin_masks(self, king: int, white: bool):
+        """
+        Same as board_utils.check_and_pin_masks, computed with integer operations
+
+        Returns:
+            number of checkers, mask of squares that block or capture the check (all squares if not in check)
+            and a dict from pinned square to the mask of the ray it may move along
+        """
+        pieces = self.pieces
+        base = 6 if white else 0
+        own = self.colors[WHITE if white else BLACK]
+        checkers = self.attackers(king, not white)
+        check_mask = checkers
+        pins = {}
+
+        queens = pieces[base + 4]
+        # sliders that would attack the king if at most our own pieces were removed
+        snipers = (rook_attacks(king, self.occupied & ~own) & (pieces[base + 3] | queens)) | \
+                  (bishop_attacks(king, self.occupied & ~own) & (pieces[base + 2] | queens))
+        while snipers:
+            bit = snipers & -snipers
+            snipers ^= bit
+            sniper = bit.bit_length() - 1
+            between = BETWEEN[king][sniper]
+            blockers = between & self.occupied
+            if blockers == 0:
+                check_mask |= between
+            elif blockers & (blockers - 1) == 0 and blockers & own:
+                pins[blockers.bit_length() - 1] = between | bit
+
+        count = bin(checkers).count("1")
+        return count, check_mask if count else FULL_MASK, pins
+
+    def king_targets(self, king: int, white: bool) -> int:
+        """
+        Args:
+            king (int): square index of the king
+            white (bool): color of the king
+
+        Returns:
+            int: Mask of the squares the king can step to without being attacked
+        """
+        own = self.colors[WHITE if white else BLACK]
+        # the king is lifted so that sliders attack the squares behind it
+        occupied = self.occupied & ~(1 << king)
+        targets = KING_ATTACKS[king] & ~own
+        bits = targets
+        while bits:
+            bit = bits & -bits
+            bits ^= bit
+            if self.attacked(bit.bit_length() - 1, not white, occupied):
+                targets ^= bit
+        return targets
+
+    def piece_moves(self, white: bool, allowed: int, pins: dict, moves, only=None):
+        """
+        Append the legal moves of every piece of one side except the king, without en passant.
+        Pawns that are not pinned are moved all at once by shifting the pawn bitboard
+
+        Args:
+            white (bool): the side to generate for
+            allowed (int): mask of the squares a move may end on, the check mask of check_and_pin_masks,
+                narrowed to captures or quiet moves by a staged generator
+            pins (dict): pinned square index to the mask of the ray it may move along
+            moves: array('H') or list the packed moves are appended to
+            only: square index to restrict the generation to, None for all pieces
+        """
+        pieces = self.pieces
+        base = 0 if white else 6
+        enemy = self.colors[BLACK if white else WHITE]
+        occupied = self.occupied
+        empty = ~occupied & FULL_MASK
+        append = moves.append
+        limit = FULL_MASK if only is None else 1 << only
+        pinned = 0
+        for square in pins:
+            pinned |= 1 << square
+
+        pawns = pieces[base] & limit
+        free = pawns & ~pinned
+        # targets of the free pawns, with the distance from the target back to the start square
+        if white:
+            push = (free >> 8) & empty
+            shifts = ((push, 8), (((push & RANK_MASKS[5]) >> 8) & empty, 16),
+                      (((free & NOT_FILE_A) >> 9) & enemy, 9), (((free & NOT_FILE_H) >> 7) & enemy, 7))
+        else:
+            push = (free << 8) & empty
+            shifts = ((push, -8), (((push & RANK_MASKS[2]) << 8) & empty, -16),
+                      (((free & NOT_FILE_A) << 7) & enemy, -7), (((free & NOT_FILE_H) << 9) & enemy, -9))
+        for targets, shift in shifts:
+            targets &= allowed
+            while targets:
+                bit = targets & -targets
+                targets ^= bit
+                end = bit.bit_length() - 1
+                move = (end + shift) | end << 6
+                if end < 8 or end >= 56:
+                    for promotion in PROMOTION_FLAGS:
+                        append(move | promotion)
+                else:
+                    append(move)
+
+        pawns &= pinned
+        while pawns:
+            bit = pawns & -pawns
+            pawns ^= bit
+            square = bit.bit_length() - 1
+            if white:
+                push = (bit >> 8) & empty
+                targets = push | ((push >> 8) & empty & RANK_MASKS[4])
+            else:
+                push = (bit << 8) & empty
+                targets = push | ((push << 8) & empty & RANK_MASKS[3])
+            targets |= PAWN_ATTACKS[WHITE if white else BLACK][square] & enemy
+            targets &= allowed & pins[square]
+            while targets:
+                bit = targets & -targets
+                targets ^= bit
+                end = bit.bit_length() - 1
+                if end < 8 or end >= 56:
+                    for promotion in PROMOTION_FLAGS:
+                        append(square | end << 6 | promotion)
+                else:
+                    append(square | end << 6)
+
+        allowed &= ~self.colors[WHITE if white else BLACK]
+        for kind in range(1, 5):
+            bits = pieces[base + kind] & limit
+            while bits:
+                bit = bits & -bits
+                bits ^= bit
+                square = bit.bit_length() - 1
+                if kind == 1:
+                    targets = KNIGHT_ATTACKS[square] & allowed
+                elif kind == 2:
+                    targets = bishop_attacks(square, occupied) & allowed
+                elif kind == 3:
+                    targets = rook_attacks(square, occupied) & allowed
+                else:
+                    targets = (bishop_attacks(square, occupied) | rook_attacks(square, occupied)) & allowed
+                if bit & pinned:
+                    targets &= pins[square]
+                while targets:
+                    bit = targets & -targets
+                    targets ^= bit
+                    append(square | (bit.bit_length() - 1) << 6)
@@ -1,11 +1,100 @@
+from .tables import *
+
+# Internally squares are integers 0..63 (row * 8 + col, so a8 is 0 and h1 is 63) and moves are packed
+# into one integer: start square in bits 0-5, end square in bits 6-11 and the promotion code in bits 12-14.
+# Strings are only used at the play_move boundary
+SQUARE_NAMES = [chr(ord('a') + col) + str(8 - row) for row in range(8) for col in range(8)]
+SQUARE_INDEX = {name: square for square, name in enumerate(SQUARE_NAMES)}
+# promoted piece (lower case) by promotion code, 0 for no promotion
+PROMOTIONS = ('', 'n', 'b', 'r', 'q')
+PROMOTION_CODES = {'n': 1, 'b': 2, 'r': 3, 'q': 4}
+# promotion bits of a packed move for every promotion piece, queen first
+PROMOTION_FLAGS = (4 << 12, 3 << 12, 2 << 12, 1 << 12)
+
+def pack_move(start: int, end: int, promotion: str = '') -> int:
+    """
+    Args:
+        start (int): starting square index
+        end (int): ending square index
+        promotion (str): promoted piece, '' if none
+    Returns:
+        int: The packed move
+    """
+    return start | end << 6 | (PROMOTION_CODES[promotion.lower()] << 12 if promotion else 0)
+
+def parse_move(move: str) -> int:
+    """
+    Args:
+        move (str): move in the play_move format, optionally followed by the promotion piece (i.e. e7e8q or e7e8=N)
+    Returns:
+        int: The packed move
+    """
+    promotion = PROMOTION_CODES.get(move[-1].lower(), 0) if len(move) > 4 else 0
+    return SQUARE_INDEX[move[:2]] | SQUARE_INDEX[move[2:4]] << 6 | promotion << 12
+
+def move_name(move: int) -> str:
+    """
+    Args:
+        move (int): packed move
+    Returns:
+        str: The move in the play_move format, with the promoted piece appended (i.e. e7e8q)
+    """
+    return SQUARE_NAMES[move & 63] + SQUARE_NAMES[move >> 6 & 63] + PROMOTIONS[move >> 12]
+
+class Move:
+    """
+    Readable view of a packed move for debugging, i.e. Move(parse_move("e7e8q")) shows as Move('e7e8q')
+    """
+    __slots__ = ("value",)
+
+    def __init__(self, move):
+        """
+        Args:
+            move (int) or (str): packed move, or a move in the play_move format
+        """
+        self.value = parse_move(move) if isinstance(move, str) else int(move)
+
+    @property
+    def start(self) -> str:
+        return SQUARE_NAMES[self.value & 63]
+
+    @property
+    def end(self) -> str:
+        return SQUARE_NAMES[self.value >> 6 & 63]
+
+    @property
+    def promotion(self) -> str:
+        return PROMOTIONS[self.value >> 12]
+
+    def __int__(self):
+        return self.value
+
+    def __eq__(self, other):
+        if isinstance(other, Move):
+            other = other.value
+        elif isinstance(other, str):
+            other = parse_move(other)
+        return self.value == other
+
+    def __hash__(self):
+        return hash(self.value)
+
+    def __str__(self):
+        return move_name(self.value)
+
+    def __repr__(self):
+        return f"Move({move_name(self.value)!r})"
+
 def get_piece(board, square:str) -> str:
     """
     Args:
         board (list): 2D list representing the chess board
-        square (str): algebraic notation of the square (e.g. 'e2')
+        square (str): algebraic notation of the square (e.g. 'e2'), or its index
     Returns:
         str: The piece on the square in the board
     """
+    if type(square) is int:
+        return board[square >> 3][square & 7]
     row, col = str2index(square)
     return board[row][col]
 
@@ -13,13 +102,15 @@ def str2index(square) -> tuple:
     """
     Function to convert algebraic notation to board index
     Args:
-        square: string notation of the square (e.g. 'e2')
+        square: string notation of the square (e.g. 'e2'), or its index (e.g. 52)
 
     Returns: a tuple of the row and column index
 
     """
     if isinstance(square, tuple):
         return square
+    if isinstance(square, int):
+        return square >> 3, square & 7
 
     try:
         col = ord(square[0]) - ord('a')
@@ -32,13 +123,15 @@ def index2str(index) -> str:
     """
     Function to convert board index to algebraic notation
     Args:
-        index: tuple of the row and column index
+        index: tuple of the row and column index, or the square index (e.g. 52)
 
     Returns: a string notation of the square (e.g. 'e2')
 
     """
     if isinstance(index, str):
         return index
+    if isinstance(index, int):
+        return SQUARE_NAMES[index]
 
     try:
         col = chr(index[1] + ord('a'))
@@ -55,8 +148,8 @@ def move_piece(board, start, end):
         start: string or tuple of the starting square.
         end: string or tuple of the ending square.
     Format of input:
-        start: 'e2' or (6, 4)
-        end: 'e4' or (4, 4)
+        start: 'e2', (6, 4) or 52
+        end: 'e4', (4, 4) or 36
     Returns:
 
     """
@@ -72,8 +165,8 @@ def is_horizontal_move(start, end):
         start: string or tuple of the starting square.
         end: string or tuple of the ending square.
     Format of input:
-        start: 'e2' or (6, 4)
-        end: 'e4' or (4, 4)
+        start: 'e2', (6, 4) or 52
+        end: 'e4', (4, 4) or 36
     Returns:
 
     """
@@ -88,8 +181,8 @@ def is_vertical_move(start, end):
         start: string or tuple of the starting square.
         end: string or tuple of the ending square.
     Format of input:
-        start: 'e2' or (6, 4)
-        end: 'e4' or (4, 4)
+        start: 'e2', (6, 4) or 52
+        end: 'e4', (4, 4) or 36
     Returns:
 
     """
@@ -104,8 +197,8 @@ def is_diagonal_move(start, end):
         start: string or tuple of the starting square.
         end: string or tuple of the ending square.
     Format of input:
-        start: 'e2' or (6, 4)
-        end: 'e4' or (4, 4)
+        start: 'e2', (6, 4) or 52
+        end: 'e4', (4, 4) or 36
     Returns:
 
     """
@@ -121,8 +214,8 @@ def empty_between_horizontal(board, start, end):
         start: string or tuple of the starting square.
         end: string or tuple of the ending square.
     Format of input:
-        start: 'e2' or (6, 4)
-        end: 'e4' or (4, 4)
+        start: 'e2', (6, 4) or 52
+        end: 'e4', (4, 4) or 36
     Returns:
         bool: True if there are no pieces between the start and end square.
         False otherwise.
@@ -148,8 +241,8 @@ def empty_between_vertical(board, start, end):
         start: string or tuple of the starting square.
         end: string or tuple of the ending square.
     Format of input:
-        start: 'e2' or (6, 4)
-        end: 'e4' or (4, 4)
+        start: 'e2', (6, 4) or 52
+        end: 'e4', (4, 4) or 36
     Returns:
         bool: True if there are no pieces between the start and end square.
         False otherwise.
@@ -175,8 +268,8 @@ def empty_between_diagonal(board, start, end):
         start: string or tuple of the starting square.
         end: string or tuple of the ending square.
     Format of input:
-        start: 'e2' or (6, 4)
-        end: 'e4' or (4, 4)
+        start: 'e2', (6, 4) or 52
+        end: 'e4', (4, 4) or 36
     Returns:
         bool: True if there are no pieces between the start and end square.
         False otherwise.
@@ -211,66 +304,116 @@ def is_square_attacked(board, square, color):
     Returns:
         bool: True if the square is attacked, False otherwise.
     """
-    opponent_color = "b" if color == "w" else "w"
-    row, col = str2index(square)
+    if type(board) is not list:
+        # alternate board backends (logic.bitboard.Bitboard) answer attack queries themselves
+        return board.is_square_attacked(square, color)
 
-    pawn_direction = 1 if opponent_color == "w" else -1 
-    for dc in [-1, 1]:  # 左右两个斜向方向
-        r = row + pawn_direction
-        c = col + dc
-        if 0 <= r < 8 and 0 <= c < 8:
-            piece = board[r][c]
-            if piece.lower() == 'p' and piece.islower() == (opponent_color == "b"):
-                return True
+    row, col = str2index(square)
+    square = row * 8 + col
+    if color == "w":
+        pawn, knight, king, straight, diagonal = 'p', 'n', 'k', ('r', 'q'), ('b', 'q')
+    else:
+        pawn, knight, king, straight, diagonal = 'P', 'N', 'K', ('R', 'Q'), ('B', 'Q')
 
+    # an opponent pawn attacks the square from where our own pawn would attack it
+    for r, c in PAWN_ATTACKS[color][square]:
+        if board[r][c] == pawn:
+            return True
 
-    knight_moves = [(-2, -1), (-2, 1), (2, -1), (2, 1),
-                    (-1, -2), (-1, 2), (1, -2), (1, 2)]
-    for dr, dc in knight_moves:
-        r, c = row + dr, col + dc
-        if 0 <= r < 8 and 0 <= c < 8:
-            piece = board[r][c]
-            if piece.lower() == 'n' and piece.islower() == (opponent_color == "b"):
-                return True
+    for r, c in KNIGHT_TARGETS[square]:
+        if board[r][c] == knight:
+            return True
 
-    for dr, dc in [(-1, 0), (1, 0), (0, -1), (0, 1)]:
-        r, c = row, col
-        while True:
-            r += dr
-            c += dc
-            if not (0 <= r < 8 and 0 <= c < 8):
-                break
+    for ray in ROOK_RAYS[square]:
+        for r, c in ray:
             piece = board[r][c]
             if piece:
-                if (piece.lower() in ['r', 'q']) and (piece.islower() == (opponent_color == "b")):
+                if piece in straight:
                     return True
-                break  
-
-    for dr, dc in [(-1, -1), (-1, 1), (1, -1), (1, 1)]:
-        r, c = row, col
-        while True:
-            r += dr
-            c += dc
-            if not (0 <= r < 8 and 0 <= c < 8):
                 break
+
+    for ray in BISHOP_RAYS[square]:
+        for r, c in ray:
             piece = board[r][c]
             if piece:
-                if (piece.lower() in ['b', 'q']) and (piece.islower() == (opponent_color == "b")):
-                    return True
-                break 
-
-    for dr in [-1, 0, 1]:
-        for dc in [-1, 0, 1]:
-            if dr == 0 and dc == 0:
-                continue
-            r, c = row + dr, col + dc
-            if 0 <= r < 8 and 0 <= c < 8:
-                piece = board[r][c]
-                if piece.lower() == 'k' and piece.islower() == (opponent_color == "b"):
+                if piece in diagonal:
                     return True
+                break
+
+    for r, c in KING_TARGETS[square]:
+        if board[r][c] == king:
+            return True
 
     return False
 
+def check_and_pin_masks(board, king, side, attacks=None):
+    """
+    Walk once outwards from a king to find the pieces giving check and the pinned pieces. A move of
+    any piece but the king is then legal exactly when its target is in the check mask and, for a
+    pinned piece, on its pin ray. King moves and en passant still need an attack lookup
+
+    Args:
+        board (list): The chessboard.
+        king (str) or (tuple): The square of the king (e.g., "e1", (7, 4)).
+        side (str): The color of the king ("w" or "b").
+        attacks: optional AttackMap of the board, pawn and knight checks are only looked for
+            when it says the king is attacked
+
+    Returns:
+        number of checkers, mask of squares that block or capture the check (all squares if not in check)
+        and a dict from pinned square index (row * 8 + col) to the mask of the ray it may move along
+    """
+    king_row, king_col = str2index(king)
+    king = king_row * 8 + king_col
+    white = side == 'w'
+    if type(board) is not list:
+        # alternate board backends (logic.bitboard.Bitboard) compute the masks themselves
+        return board.check_and_pin_masks(king, white)
+
+    checkers = 0
+    check_mask = 0
+    pins = {}
+
+    if attacks is None or attacks.attacked(king, not white):
+        pawn = 'p' if white else 'P'
+        for row, col in PAWN_ATTACKS[side][king]:
+            if board[row][col] == pawn:
+                checkers += 1
+                check_mask |= 1 << (row * 8 + col)
+
+        knight = 'n' if white else 'N'
+        for row, col in KNIGHT_TARGETS[king]:
+            if board[row][col] == knight:
+                checkers += 1
+                check_mask |= 1 << (row * 8 + col)
+
+    for i, ray in enumerate(RAYS[king]):
+        sliders = ('r', 'q') if i < 4 else ('b', 'q')
+        if not white:
+            sliders = (sliders[0].upper(), sliders[1].upper())
+        mask = 0
+        blocker = None
+        for row, col in ray:
+            mask |= 1 << (row * 8 + col)
+            piece = board[row][col]
+            if piece != '':
+                if piece.isupper() == white:
+                    if blocker is not None:
+                        break
+                    blocker = row * 8 + col
+                else:
+                    if piece in sliders:
+                        if blocker is None:
+                            checkers += 1
+                            check_mask |= mask
+                        else:
+                            pins[blocker] = mask
+                    break
+
+    if checkers == 0:
+        check_mask = FULL_MASK
+    return checkers, check_mask, pins
+
 def invalid_move_for_piece(board, move, side) -> bool:
     """
         Function to check if move is valid for white
@@ -417,10 +560,16 @@ def pawn_moves(board, i, j, side) -> list[tuple[int, int]]:
             if board[i + 2 * direction][j] == '':
                 moves.append((i + 2 * direction, j))
     # capture diagonally
-    if j > 0:
-        moves.append((i + direction, j - 1))
-    if j < 7:
-        moves.append((i + direction, j + 1))
+    moves.extend(PAWN_ATTACKS[side][i * 8 + j])
+    return moves
+
+def _ray_moves(board, rays) -> list[tuple[int, int]]:
+    moves = []
+    for ray in rays:
+        for r, c in ray:
+            moves.append((r, c))
+            if board[r][c] != '':
+                break
     return moves
 
 def rook_moves(board, i, j, side) -> list[tuple[int, int]]:
@@ -434,19 +583,7 @@ def rook_moves(board, i, j, side) -> list[tuple[int, int]]:
 
     Returns:
     """
-    moves = []
-    for direction in [(1, 0), (-1, 0), (0, 1), (0, -1)]:
-        for k in range(1, 8):
-            new_i = i + k * direction[0]
-            new_j = j + k * direction[1]
-            if not (0 <= new_i < 8 and 0 <= new_j < 8):
-                break
-            if board[new_i][new_j] == '':
-                moves.append((new_i, new_j))
-            else:
-                moves.append((new_i, new_j))
-                break
-    return moves
+    return _ray_moves(board, ROOK_RAYS[i * 8 + j])
 
 def knight_moves(board, i, j, side) -> list[tuple[int, int]]:
     """
@@ -459,13 +596,12 @@ def knight_moves(board, i, j, side) -> list[tuple[int, int]]:
 
     Returns:
     """
+    white = side == 'w'
     moves = []
-    for direction in [(1, 2), (2, 1), (-1, 2), (-2, 1), (1, -2), (2, -1), (-1, -2), (-2, -1)]:
-        new_i = i + direction[0]
-        new_j = j + direction[1]
-        if 0 <= new_i < 8 and 0 <= new_j < 8:
-            if board[new_i][new_j] == '' or board[new_i][new_j].isupper() != side.isupper():
-                moves.append((new_i, new_j))
+    for r, c in KNIGHT_TARGETS[i * 8 + j]:
+        target = board[r][c]
+        if target == '' or target.isupper() != white:
+            moves.append((r, c))
     return moves
 
 def bishop_moves(board, i, j, side) -> list[tuple[int, int]]:
@@ -479,19 +615,7 @@ def bishop_moves(board, i, j, side) -> list[tuple[int, int]]:
 
     Returns:
     """
-    moves = []
-    for direction in [(1, 1), (1, -1), (-1, 1), (-1, -1)]:
-        for k in range(1, 8):
-            new_i = i + k * direction[0]
-            new_j = j + k * direction[1]
-            if not (0 <= new_i < 8 and 0 <= new_j < 8):
-                break
-            if board[new_i][new_j] == '':
-                moves.append((new_i, new_j))
-            else:
-                moves.append((new_i, new_j))
-                break
-    return moves
+    return _ray_moves(board, BISHOP_RAYS[i * 8 + j])
 
 def queen_moves(board, i, j, side) -> list[tuple[int, int]]:
     """
@@ -504,8 +628,7 @@ def queen_moves(board, i, j, side) -> list[tuple[int, int]]:
 
     Returns:
     """
-    moves = rook_moves(board, i, j, side) + bishop_moves(board, i, j, side)
-    return moves
+    return _ray_moves(board, RAYS[i * 8 + j])
 
 def king_moves(board, i, j, side) -> list[tuple[int, int]]:
     """
@@ -518,10 +641,4 @@ def king_moves(board, i, j, side) -> list[tuple[int, int]]:
 
     Returns:
     """
-    moves = []
-    for direction in [(1, 1), (1, -1), (-1, 1), (-1, -1), (1, 0), (-1, 0), (0, 1), (0, -1)]:
-        new_i = i + direction[0]
-        new_j = j + direction[1]
-        if 0 <= new_i < 8 and 0 <= new_j < 8:
-            moves.append((new_i, new_j))
-    return moves
\ No newline at end of file
+    return list(KING_TARGETS[i * 8 + j])
@@ -1,12 +1,43 @@
-import copy
+from array import array
+
 from .board_utils import *
-from .special_moves import Castling, EnPassant, Promotion
+from .special_moves import Castling, EnPassant, WHITE_KING_SIDE, WHITE_QUEEN_SIDE, BLACK_KING_SIDE, BLACK_QUEEN_SIDE
+from .bitboard import Bitboard
+from .attack_map import AttackMap
+from .zobrist import PIECE_KEYS, SIDE_KEY, CASTLING_KEYS, EN_PASSANT_KEYS, en_passant_file, compute_hash
+from .evaluation import MG_TABLES, EG_TABLES, PHASES, score_board, tapered
+
+# FEN characters, digits expand to runs of empty squares
+FEN_PIECES = set("PNBRQKpnbrqk")
+FEN_EMPTY = {str(n): [''] * n for n in range(1, 9)}
+FEN_CASTLING = {'K': WHITE_KING_SIDE, 'Q': WHITE_QUEEN_SIDE, 'k': BLACK_KING_SIDE, 'q': BLACK_QUEEN_SIDE}
+
+def print_trace(event: str, data: dict):
+    """
+    Trace callback printing every event on one line, see ChessLogic.trace
+    """
+    print(event, ' '.join(f"{key}={value}" for key, value in data.items()))
+
+class UndoRecord:
+    """
+    Everything make_move overwrites, so that unmake_move can restore the position exactly.
+    Records live on the ChessLogic move stack and are reused from ply to ply instead of being
+    allocated per move.
+    """
+    __slots__ = ("start", "end", "moved_piece", "captured_piece", "captured_index", "rook_start", "rook_end",
+                 "castling_rights", "last_move", "en_passant_file", "white_king_index", "black_king_index", "hash",
+                 "halfmove_clock", "move", "mg_score", "eg_score", "phase")
 
 class ChessLogic:
-    def __init__(self):
+    def __init__(self, backend: str = "list"):
         """
         Initalize the ChessLogic Object. External fields are board and result
 
+        backend -> How the board is stored
+            list - Two Dimensional List of strings
+
+            bitboard - logic.bitboard.Bitboard, twelve 64 bit integers behind the same board[row][col] interface
+
         board -> Two Dimensional List of string Representing the Current State of the Board
             P, R, N, B, Q, K - White Pieces
 
@@ -22,7 +53,24 @@ class ChessLogic:
             d - Draw
 
             '' - Game In Progress
+
+        hash -> 64 bit Zobrist key of the current position (pieces, side to move, castling rights and en passant file)
+
+        halfmove_clock -> Number of moves by either side since the last capture or pawn move, for the fifty-move rule
+
+        fullmove_number -> Number of the current full move, starting at 1 and incremented after black moves
+
+        mg_score, eg_score, phase -> Material and piece-square evaluation terms (see logic.evaluation), updated
+            by make_move / unmake_move. evaluate() blends them into one score
+
+        trace -> None, or a callable trace(event, data) receiving debug events as an event name and a dict,
+            i.e. logic.trace = print_trace. Tracing costs a single attribute check while it is None
+                invalid_move - a move was validated (move, side, piece, causes_check, invalid_for_piece, reason)
+
+                king_checked - a king was tested for check (side, square, checked)
         """
+        self._init_state()
+
         self.board = [
             ['r', 'n', 'b', 'q', 'k', 'b', 'n', 'r'],
             ['p', 'p', 'p', 'p', 'p', 'p', 'p', 'p'],
@@ -33,13 +81,258 @@ class ChessLogic:
             ['P', 'P', 'P', 'P', 'P', 'P', 'P', 'P'],
             ['R', 'N', 'B', 'Q', 'K', 'B', 'N', 'R'],
         ]
-        self.result = ""
+        self._set_backend(backend)
+
+    def _init_state(self):
+        """
+        Set every field except the board to the state of the initial position
+        """
+        self.trace = None
+        # game result, None until it is computed for the current position
+        self._result = None
         self.turn = 'w'
         self.castling = Castling()
         self.en_passant = EnPassant()
-        self.promotion = Promotion()
         self.white_king_index = (7, 4)
         self.black_king_index = (0, 4)
+        self.halfmove_clock = 0
+        self.fullmove_number = 1
+
+        # move stack for make_move / unmake_move, _ply is the number of records in use
+        self._move_stack: list[UndoRecord] = []
+        self._ply = 0
+        # one reusable packed move buffer per ply, see _move_buffer
+        self._move_buffers: list[array] = []
+
+    @property
+    def backend(self) -> str:
+        """
+        The board backend, "list" or "bitboard", as passed to the constructor
+        """
+        return "bitboard" if type(self.board) is Bitboard else "list"
+
+    def _set_backend(self, backend: str):
+        if backend == "bitboard":
+            self.board = Bitboard(self.board)
+        elif backend != "list":
+            raise ValueError(f"Unknown board backend: {backend}")
+
+    @property
+    def result(self) -> str:
+        """
+        The result of the game, computed on first access after each move and cached until the next one
+        """
+        if self._result is None:
+            self._result = self._game_over()
+        return self._result
+
+    @result.setter
+    def result(self, result: str):
+        self._result = result
+
+    @property
+    def board(self):
+        return self._board
+
+    @board.setter
+    def board(self, board):
+        self._board = board
+        self.sync_state()
+
+    def sync_state(self):
+        """
+        Rebuild the state derived from board, turn, castling and en passant (position hash, position
+        history and piece counts). Assigning a new board does this automatically, call it after editing
+        the board in place or changing the other fields by hand
+        """
+        board = self._board
+        self._result = None
+        self._en_passant_file = en_passant_file(board, self.en_passant.last)
+        self.hash = compute_hash(board, self.turn, self.castling.rights, self._en_passant_file)
+        self.mg_score, self.eg_score, self.phase = score_board(board)
+
+        # the position history starts over from the current position
+        self.hash_history = [self.hash]
+        self._repetitions = {self.hash: 1}
+
+        # the bitboard answers attack queries itself
+        self.attacks = board if type(board) is Bitboard else AttackMap(board)
+        self.piece_squares = {piece: set() for piece in "PNBRQKpnbrqk"}
+        for row in range(8):
+            for col in range(8):
+                if board[row][col] != '':
+                    self.piece_squares[board[row][col]].add(row * 8 + col)
+
+    def evaluate(self) -> int:
+        """
+        Function to evaluate the position statically from material and piece-square tables, tapered between
+        the middlegame and the endgame. The terms are kept up to date by make_move, so this costs a few operations
+
+        Returns:
+            int: Score in centipawns, positive when white is better
+        """
+        return tapered(self.mg_score, self.eg_score, self.phase)
+
+    @property
+    def piece_counts(self) -> dict[str, int]:
+        """
+        Number of pieces of every type on the board, by piece character
+        """
+        return {piece: len(squares) for piece, squares in self.piece_squares.items()}
+
+    def snapshot(self) -> str:
+        """
+        Function to encode the position compactly, i.e. to send it to another process
+
+        Returns:
+            str: 64 board characters ('.' for empty squares, a8 first), turn, castling rights,
+            last move ('-' if none), halfmove clock, fullmove number and the hashes (hex, comma separated,
+            '-' if none) of the earlier positions since the last capture or pawn move, separated by spaces.
+            Those are the only positions the current one can repeat, so repetitions are still detected
+            after decoding
+        """
+        board = ''.join(self.board[row][col] or '.' for row in range(8) for col in range(8))
+        history = self.hash_history[-self.halfmove_clock - 1:-1]
+        history = ','.join(f"{key:x}" for key in history) or '-'
+        return (f"{board} {self.turn} {self.castling.rights} {self.en_passant.last_move or '-'} "
+                f"{self.halfmove_clock} {self.fullmove_number} {history}")
+
+    @classmethod
+    def from_snapshot(cls, snapshot: str, backend: str = "list") -> "ChessLogic":
+        """
+        Function to rebuild a position encoded with snapshot
+
+        Args:
+            snapshot (str): the output of ChessLogic.snapshot
+            backend (str): board backend, "list" or "bitboard"
+
+        Returns:
+            ChessLogic: the decoded position
+        """
+        board, turn, rights, last_move, halfmove_clock, fullmove_number, history = snapshot.split(" ")
+        logic = cls.__new__(cls)
+        logic._init_state()
+        logic.turn = turn
+        logic.castling.rights = int(rights)
+        logic.en_passant.last_move = None if last_move == '-' else last_move
+        logic.halfmove_clock = int(halfmove_clock)
+        logic.fullmove_number = int(fullmove_number)
+        logic.white_king_index = divmod(board.index('K'), 8)
+        logic.black_king_index = divmod(board.index('k'), 8)
+        logic.board = [['' if piece == '.' else piece for piece in board[row * 8:row * 8 + 8]] for row in range(8)]
+        logic._set_backend(backend)
+
+        # assigning the board started the position history over, put the earlier positions back in front
+        if history != '-':
+            earlier = [int(key, 16) for key in history.split(',')]
+            logic.hash_history[:0] = earlier
+            for key in earlier:
+                logic._repetitions[key] = logic._repetitions.get(key, 0) + 1
+        return logic
+
+    @classmethod
+    def from_fen(cls, fen: str, backend: str = "list") -> "ChessLogic":
+        """
+        Function to set up a position from Forsyth-Edwards Notation, all derived state (king indices,
+        hash, piece counts) is computed while parsing
+
+        Args:
+            fen (str): the position, i.e. "rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq e3 0 1".
+                The halfmove clock and fullmove number are optional
+            backend (str): board backend, "list" or "bitboard"
+
+        Returns:
+            ChessLogic: the position
+
+        Raises:
+            ValueError: if the FEN is malformed
+        """
+        fields = fen.split()
+        if len(fields) not in (4, 6):
+            raise ValueError(f"Invalid FEN: {fen}")
+        placement, turn, castling, en_passant = fields[:4]
+        ranks = placement.split('/')
+        if len(ranks) != 8 or turn not in ('w', 'b'):
+            raise ValueError(f"Invalid FEN: {fen}")
+
+        logic = cls.__new__(cls)
+        logic._init_state()
+        board = []
+        white_king = black_king = None
+        for row, rank in enumerate(ranks):
+            squares = []
+            for char in rank:
+                if char in FEN_EMPTY:
+                    squares.extend(FEN_EMPTY[char])
+                elif char in FEN_PIECES:
+                    if char == 'K':
+                        white_king = (row, len(squares))
+                    elif char == 'k':
+                        black_king = (row, len(squares))
+                    squares.append(char)
+                else:
+                    raise ValueError(f"Invalid FEN: {fen}")
+            if len(squares) != 8:
+                raise ValueError(f"Invalid FEN: {fen}")
+            board.append(squares)
+        if white_king is None or black_king is None:
+            raise ValueError(f"Invalid FEN: {fen}")
+
+        rights = 0
+        if castling != '-':
+            for char in castling:
+                if char not in FEN_CASTLING:
+                    raise ValueError(f"Invalid FEN: {fen}")
+                rights |= FEN_CASTLING[char]
+
+        if en_passant != '-':
+            # the en passant square is behind the pawn, rebuild the double push that created it
+            if len(en_passant) != 2 or en_passant[0] not in "abcdefgh" or en_passant[1] not in "36":
+                raise ValueError(f"Invalid FEN: {fen}")
+            file = en_passant[0]
+            logic.en_passant.last_move = f"{file}2{file}4" if en_passant[1] == '3' else f"{file}7{file}5"
+
+        logic.turn = turn
+        logic.castling.rights = rights
+        logic.white_king_index = white_king
+        logic.black_king_index = black_king
+        if len(fields) == 6:
+            logic.halfmove_clock = int(fields[4])
+            logic.fullmove_number = int(fields[5])
+        logic.board = board
+        logic._set_backend(backend)
+        return logic
+
+    def to_fen(self) -> str:
+        """
+        Function to describe the position in Forsyth-Edwards Notation
+
+        Returns:
+            str: the FEN of the position, the en passant square is given after every double pawn push
+        """
+        ranks = []
+        for row in range(8):
+            rank = ''
+            empty = 0
+            for piece in self.board[row]:
+                if piece == '':
+                    empty += 1
+                    continue
+                if empty:
+                    rank += str(empty)
+                    empty = 0
+                rank += piece
+            ranks.append(rank + str(empty) if empty else rank)
+
+        castling = ''.join(char for char, right in FEN_CASTLING.items() if self.castling.rights & right) or '-'
+
+        en_passant = '-'
+        last_move = self.en_passant.last_move
+        if last_move and last_move[0] == last_move[2] and abs(int(last_move[1]) - int(last_move[3])) == 2 and \
+                get_piece(self.board, last_move[2:4]) in ('P', 'p'):
+            en_passant = last_move[0] + ('3' if last_move[3] == '4' else '6')
+
+        return f"{'/'.join(ranks)} {self.turn} {castling} {en_passant} {self.halfmove_clock} {self.fullmove_number}"
 
     def play_move(self, move: str) -> str:
         """
@@ -54,7 +347,8 @@ class ChessLogic:
             str: Extended Chess Notation for the move, if valid. Empty str if the move is invalid
         """
         starting = move[:2]
-        ending = move[2:]
+        # anything after the end square names the promotion piece
+        ending = move[2:4]
         starting_piece = get_piece(self.board, starting)
         ending_piece = get_piece(self.board, ending)
 
@@ -67,46 +361,62 @@ class ChessLogic:
             return ""
 
         # handle special moves
-        if self.castling.applies(self.board, move):
+        if self.castling.applies(self.board, move, self.attacks):
             #print("castling")
-            result = self.castling.handle(self.board, move)
+            move = self.castling.KING_MOVES.get(move, move)
+            result = "0-0" if "g" in move else "0-0-0"
         elif self.en_passant.applies(self.board, move):
             #print("en passant")
-            result =  self.en_passant.handle(self.board, move)
+            if self.move_causes_check(move, self.turn):
+                return ""
+            result = f"{starting}x{ending}"
         else:
             # handle normal moves
             if self._invalid_move(move):
                 #print("Invalid move")
                 return ""
-            # move the piece
             #print("normal move")
-            result = self._handle_move_capture(starting, ending)
-
-        if starting_piece == 'k':
-            self.black_king_index = str2index(ending)
-            self.castling.back_castling_allowed = False
-        if starting_piece == 'K':
-            self.white_king_index = str2index(ending)
-            self.castling.white_castling_allowed = False
-        if starting_piece == 'r':
-            self.castling.back_castling_allowed = False
-        if starting_piece == 'R':
-            self.castling.white_castling_allowed = False
-        self.en_passant.last_move = move
-
-        # switch the move
-        self.turn = 'w' if self.turn == 'b' else 'b'
+            result = self._move_notation(starting, ending)
+
+        # checked before the move, afterwards the promoted piece stands on the end square
+        promoting = starting_piece.lower() == 'p' and ending[1] in "18"
 
-        if self.promotion.applies(self.board, move):
-            #print("promotion")
-            result += self.promotion.handle(self.board, move)
+        # move the piece, this also switches the turn
+        self.make_move(move)
 
-        # determine if the game is over
-        self.result = self._game_over()
+        if promoting:
+            result += f"={get_piece(self.board, ending).upper()}"
 
         # print(result)
         return result
 
+    def apply_moves(self, moves, verify: bool = False) -> str:
+        """
+        Function to play a sequence of moves, i.e. to replay a game record
+
+        Args:
+            moves: iterable of moves in the make_move format, strings or packed (i.e. the history of another game)
+            verify (bool): validate every move with play_move and stop at the end of the game.
+                Without it the moves are trusted and applied with make_move
+
+        Returns:
+            str: The result of the game after the last move, see result
+
+        Raises:
+            ValueError: if verify is set and a move is invalid or played after the game is over
+        """
+        if not verify:
+            for move in moves:
+                self.make_move(move)
+            return self.result
+
+        for move in moves:
+            if self.result != '':
+                raise ValueError(f"Move {move} played after the end of the game")
+            if self.play_move(move if type(move) is str else move_name(move)) == "":
+                raise ValueError(f"Invalid move {move}")
+        return self.result
+
     def _invalid_starting_piece(self, starting_piece):
         """
         @brief: Function to check if the starting piece is invalid
@@ -118,19 +428,486 @@ class ChessLogic:
         # print(f"val {val}")
         return val
 
+    def make_move(self, move):
+        """
+        Apply a move to the board without validating it and push an undo record on the move stack.
+        Captures, castling (king moving two squares), en passant and promotion are all handled.
+        The castling flags, king indices, en passant state and turn are updated as well
+
+        Args:
+            move (str) or (int): The move in the play_move format, optionally followed by the promotion piece
+                (i.e. e7e8q or e7e8=N), or packed (see board_utils.pack_move). Promotion defaults to a queen
+        """
+        if type(move) is str:
+            move = parse_move(move)
+        board = self.board
+        start = move & 63
+        end = move >> 6 & 63
+        start_row, start_col = start >> 3, start & 7
+        end_row, end_col = end >> 3, end & 7
+        piece = board[start_row][start_col]
+
+        self._result = None
+        if self._ply == len(self._move_stack):
+            self._move_stack.append(UndoRecord())
+        record = self._move_stack[self._ply]
+        self._ply += 1
+
+        record.start = start
+        record.end = end
+        record.moved_piece = piece
+        record.captured_piece = board[end_row][end_col]
+        record.captured_index = end
+        record.rook_start = None
+        record.rook_end = None
+        record.castling_rights = self.castling.rights
+        record.last_move = self.en_passant.last
+        record.en_passant_file = self._en_passant_file
+        record.white_king_index = self.white_king_index
+        record.black_king_index = self.black_king_index
+        record.hash = self.hash
+        record.halfmove_clock = self.halfmove_clock
+        record.move = move
+        record.mg_score = mg = self.mg_score
+        record.eg_score = eg = self.eg_score
+        record.phase = self.phase
+        if piece.islower():
+            self.fullmove_number += 1
+
+        # the hash is updated incrementally, xor out what changes and xor in the new values
+        key = self.hash ^ SIDE_KEY ^ CASTLING_KEYS[self.castling.rights] ^ PIECE_KEYS[piece][start]
+        if self._en_passant_file is not None:
+            key ^= EN_PASSANT_KEYS[self._en_passant_file]
+
+        attacks = self.attacks
+        squares = self.piece_squares
+        kind = piece.lower()
+        if kind == 'p':
+            if start_col != end_col and record.captured_piece == '' and board[start_row][end_col] != '':
+                # en passant, the captured pawn is next to the starting square
+                record.captured_index = start_row * 8 + end_col
+                record.captured_piece = board[start_row][end_col]
+                attacks.remove(board, record.captured_index)
+            if end_row == 0 or end_row == 7:
+                promoted = PROMOTIONS[move >> 12] or 'q'
+                piece = promoted.upper() if piece.isupper() else promoted
+                record.move = move & 4095 | PROMOTION_CODES[promoted] << 12
+                self.phase += PHASES[piece]
+        elif kind == 'k':
+            rook_squares = self.castling.ROOK_SQUARES.get(move & 4095)
+            if rook_squares is not None and board[rook_squares[0] >> 3][rook_squares[0] & 7].lower() == 'r':
+                rook_start, rook_end = record.rook_start, record.rook_end = rook_squares
+                rook = board[rook_start >> 3][rook_start & 7]
+                key ^= PIECE_KEYS[rook][rook_start] ^ PIECE_KEYS[rook][rook_end]
+                squares[rook].discard(rook_start)
+                squares[rook].add(rook_end)
+                mg += MG_TABLES[rook][rook_end] - MG_TABLES[rook][rook_start]
+                eg += EG_TABLES[rook][rook_end] - EG_TABLES[rook][rook_start]
+                attacks.remove(board, rook_start)
+                attacks.place(board, rook_end, rook)
+            if piece == 'K':
+                self.white_king_index = (end_row, end_col)
+            else:
+                self.black_king_index = (end_row, end_col)
+
+        if record.captured_piece != '':
+            key ^= PIECE_KEYS[record.captured_piece][record.captured_index]
+            squares[record.captured_piece].discard(record.captured_index)
+            mg -= MG_TABLES[record.captured_piece][record.captured_index]
+            eg -= EG_TABLES[record.captured_piece][record.captured_index]
+            self.phase -= PHASES[record.captured_piece]
+        key ^= PIECE_KEYS[piece][end]
+        # the moved piece (promoted if it is a promotion) leaves its start square and lands on the end square
+        self.mg_score = mg + MG_TABLES[piece][end] - MG_TABLES[record.moved_piece][start]
+        self.eg_score = eg + EG_TABLES[piece][end] - EG_TABLES[record.moved_piece][start]
+        squares[record.moved_piece].discard(start)
+        squares[piece].add(end)
+
+        if kind == 'p' or record.captured_piece != '':
+            self.halfmove_clock = 0
+        else:
+            self.halfmove_clock += 1
+
+        attacks.remove(board, start)
+        if board[end_row][end_col] != '':
+            attacks.replace(board, end, piece)
+        else:
+            attacks.place(board, end, piece)
+
+        self.castling.update(move)
+        key ^= CASTLING_KEYS[self.castling.rights]
+
+        self.en_passant.last = move
+        self._en_passant_file = en_passant_file(board, move) if kind == 'p' and abs(end - start) == 16 else None
+        if self._en_passant_file is not None:
+            key ^= EN_PASSANT_KEYS[self._en_passant_file]
+
+        self.hash = key
+        self.hash_history.append(key)
+        self._repetitions[key] = self._repetitions.get(key, 0) + 1
+        self.turn = 'w' if self.turn == 'b' else 'b'
+
+    def unmake_move(self):
+        """
+        Take back the last move applied with make_move, restoring the captured piece,
+        castling flags, en passant state, king indices and turn
+
+        Raises:
+            IndexError: if there is no move to take back
+        """
+        if self._ply == 0:
+            raise IndexError("no move to take back")
+        self._result = None
+        self._ply -= 1
+        record = self._move_stack[self._ply]
+        board = self.board
+        start, end = record.start, record.end
+
+        self._repetitions[self.hash] -= 1
+        self.hash_history.pop()
+        squares = self.piece_squares
+        squares[board[end >> 3][end & 7]].discard(end)
+        squares[record.moved_piece].add(start)
+        if record.captured_piece != '':
+            squares[record.captured_piece].add(record.captured_index)
+
+        attacks = self.attacks
+        if record.captured_piece != '' and record.captured_index == end:
+            attacks.replace(board, end, record.captured_piece)
+        else:
+            attacks.remove(board, end)
+        attacks.place(board, start, record.moved_piece)
+        if record.captured_piece != '' and record.captured_index != end:
+            attacks.place(board, record.captured_index, record.captured_piece)
+        if record.rook_start is not None:
+            rook = board[record.rook_end >> 3][record.rook_end & 7]
+            squares[rook].discard(record.rook_end)
+            squares[rook].add(record.rook_start)
+            attacks.remove(board, record.rook_end)
+            attacks.place(board, record.rook_start, rook)
+
+        self.castling.rights = record.castling_rights
+        self.en_passant.last = record.last_move
+        self._en_passant_file = record.en_passant_file
+        self.hash = record.hash
+        self.halfmove_clock = record.halfmove_clock
+        self.mg_score = record.mg_score
+        self.eg_score = record.eg_score
+        self.phase = record.phase
+        if record.moved_piece.islower():
+            self.fullmove_number -= 1
+        self.white_king_index = record.white_king_index
+        self.black_king_index = record.black_king_index
+        self.turn = 'w' if self.turn == 'b' else 'b'
+
     def move_causes_check(self, move, side):
         """
-            Function to check if move causes a check
+            Function to check if move causes a check. Apart from king moves and en passant this
+            is a test against the check and pin masks of the position, no move is made
             Args:
                 side: the side that is making the move
-                move: the move that the player is making
+                move: the move that the player is making, as a string or packed
             Returns:
                 True if move causes a check, else False
         """
-        board = copy.deepcopy(self.board)
-        move_piece(board, move[:2], move[2:])
-        king_index = self.white_king_index if side == 'w' else self.black_king_index
-        return is_square_attacked(board, king_index if not get_piece(board, move[2:]).lower() == 'k' else move[2:], side)
+        if type(move) is str:
+            move = parse_move(move)
+        board = self.board
+        start = move & 63
+        end = move >> 6 & 63
+        kind = board[start >> 3][start & 7].lower()
+        if kind == 'k' or (kind == 'p' and (start ^ end) & 7 and board[end >> 3][end & 7] == ''
+                           and board[start >> 3][end & 7] != ''):
+            # king moves and en passant (which also empties the captured pawn's square) are tried on the board
+            self.make_move(move)
+            king_row, king_col = self.white_king_index if side == 'w' else self.black_king_index
+            causes_check = self.attacks.attacked(king_row * 8 + king_col, side == 'b')
+            self.unmake_move()
+            return causes_check
+
+        king = self.white_king_index if side == 'w' else self.black_king_index
+        checkers, check_mask, pins = check_and_pin_masks(board, king, side, self.attacks)
+        if checkers > 1:
+            return True
+        return not (check_mask & pins.get(start, FULL_MASK)) >> end & 1
+
+    def legal_moves(self) -> list[str]:
+        """
+        Function to generate every legal move of the side to move, including castling, en passant and promotion
+
+        Returns:
+            list[str]: The legal moves in the play_move format. Promotions have the promoted piece
+            appended (i.e. e7e8q, e7e8n)
+        """
+        return [move_name(move) for move in self._generate_legal_moves()]
+
+    def legal_moves_from(self, square: str) -> list[str]:
+        """
+        Function to generate the legal moves of the piece on a square
+
+        Args:
+            square (str): algebraic notation of the square (e.g. 'e2')
+
+        Returns:
+            list[str]: The legal moves starting from the square, empty if it does not hold a piece of the side to move
+        """
+        row, col = str2index(square)
+        return [move_name(move) for move in self._generate_legal_moves(row * 8 + col)]
+
+    def perft(self, depth: int) -> int:
+        """
+        Function to count the leaf nodes of the legal move tree, used to validate and time move generation
+
+        Args:
+            depth (int): number of plies to search
+
+        Returns:
+            int: Number of positions reached after exactly depth plies
+        """
+        if depth <= 0:
+            return 1
+        moves = self._generate_legal_moves(moves=self._move_buffer())
+        if depth == 1:
+            return len(moves)
+        nodes = 0
+        for move in moves:
+            self.make_move(move)
+            nodes += self.perft(depth - 1)
+            self.unmake_move()
+        return nodes
+
+    def perft_divide(self, depth: int) -> dict[str, int]:
+        """
+        Function to run perft below every legal move, to locate the move where a node count goes wrong
+
+        Args:
+            depth (int): number of plies to search, including the root move
+
+        Returns:
+            dict[str, int]: Number of leaf nodes for each legal root move
+        """
+        counts = {}
+        for move in self.legal_moves():
+            self.make_move(move)
+            counts[move] = self.perft(depth - 1)
+            self.unmake_move()
+        return counts
+
+    def history(self) -> array:
+        """
+        Function to get the moves played with make_move since the position was set up
+
+        Returns:
+            array: The packed moves (see board_utils.pack_move) as an array('H'), two bytes per move.
+            It can be replayed with apply_moves
+        """
+        return array('H', [self._move_stack[ply].move for ply in range(self._ply)])
+
+    def _move_buffer(self) -> array:
+        """
+        Returns:
+            array: The array('H') move buffer of the current ply. It is only valid until the next
+            generation at the same ply, deeper plies have buffers of their own
+        """
+        buffers = self._move_buffers
+        while len(buffers) <= self._ply:
+            buffers.append(array('H'))
+        return buffers[self._ply]
+
+    def _generate_legal_moves(self, only=None, moves=None) -> array:
+        """
+        Generate the legal moves of the side to move in a single pass. Check and pin masks are computed
+        once from the king, so every candidate is accepted or rejected with a mask test. Only king moves
+        and en passant need an attack lookup
+        Args:
+            only: square index (row * 8 + col) to restrict the generation to, None for all pieces
+            moves: array('H') to fill (it is cleared first), a new one is made when None
+        Returns:
+            array('H') of packed moves (see board_utils.pack_move)
+        """
+        board = self.board
+        side = self.turn
+        white = side == 'w'
+        king_row, king_col = self.white_king_index if white else self.black_king_index
+        king = king_row * 8 + king_col
+        bitboard = type(board) is Bitboard
+        checkers, check_mask, pins = check_and_pin_masks(board, (king_row, king_col), side, self.attacks)
+
+        if moves is None:
+            moves = array('H')
+        else:
+            del moves[:]
+        if only is None or only == king:
+            moves.extend(self._king_moves(king_row, king_col, side, checkers))
+        if checkers > 1:
+            # double check, only the king can move
+            return moves
+
+        if bitboard:
+            board.piece_moves(white, check_mask, pins, moves, only)
+            self._en_passant_moves(side, only, moves)
+            return moves
+
+        for piece in ("PNBRQ" if white else "pnbrq"):
+            kind = piece.lower()
+            # snapshot, en passant and the king lift make and take back moves while we iterate
+            for square in tuple(self.piece_squares[piece]):
+                if only is not None and square != only:
+                    continue
+                mask = check_mask & pins.get(square, FULL_MASK)
+                if mask:
+                    self._piece_moves(square >> 3, square & 7, kind, white, mask, moves)
+
+        self._en_passant_moves(side, only, moves)
+        return moves
+
+    def _staged_legal_moves(self, side):
+        """
+        Lazily generate the legal moves of a side in stages: king moves first when in check, then captures,
+        then quiet moves. Taking only the first move answers whether any legal move exists, which usually
+        stops after a candidate or two
+        Args:
+            side: 'w' or 'b'
+        Returns:
+            generator of packed moves (see board_utils.pack_move)
+        """
+        board = self.board
+        white = side == 'w'
+        king_row, king_col = self.white_king_index if white else self.black_king_index
+        bitboard = type(board) is Bitboard
+        checkers, check_mask, pins = check_and_pin_masks(board, (king_row, king_col), side, self.attacks)
+
+        if checkers:
+            yield from self._king_moves(king_row, king_col, side, checkers)
+            if checkers > 1:
+                return
+
+        if bitboard:
+            enemy = board.colors[1 if white else 0]
+            moves = []
+            for stage in (enemy, ~enemy):
+                board.piece_moves(white, check_mask & stage, pins, moves)
+                yield from moves
+                moves.clear()
+        else:
+            squares = self.piece_squares
+            pieces = [(square, piece.lower()) for piece in ("PNBRQ" if white else "pnbrq")
+                      for square in squares[piece]]
+            enemy = 0
+            for piece in ("pnbrqk" if white else "PNBRQK"):
+                for square in squares[piece]:
+                    enemy |= 1 << square
+            moves = []
+            for stage in (enemy, ~enemy):
+                for square, kind in pieces:
+                    mask = check_mask & pins.get(square, FULL_MASK) & stage
+                    if mask:
+                        self._piece_moves(square >> 3, square & 7, kind, white, mask, moves)
+                        yield from moves
+                        moves.clear()
+
+        if not checkers:
+            yield from self._king_moves(king_row, king_col, side, checkers)
+        moves = []
+        self._en_passant_moves(side, None, moves)
+        yield from moves
+
+    def _king_moves(self, king_row, king_col, side, checkers):
+        board = self.board
+        white = side == 'w'
+        king_square = king_row * 8 + king_col
+        if type(board) is Bitboard:
+            targets = board.king_targets(king_square, white)
+            while targets:
+                bit = targets & -targets
+                targets ^= bit
+                yield king_square | (bit.bit_length() - 1) << 6
+        elif checkers == 0:
+            # no slider reaches the king, so none attacks a square behind it either and the counts are exact
+            attacked = self.attacks.counts[1 if white else 0]
+            for row, col in KING_TARGETS[king_square]:
+                target = board[row][col]
+                if (target == '' or target.isupper() != white) and not attacked[row * 8 + col]:
+                    yield king_square | (row * 8 + col) << 6
+        else:
+            king = board[king_row][king_col]
+            # lift the king so that sliders attack the squares behind it, the targets are collected before
+            # yielding so the board is never left without its king
+            board[king_row][king_col] = ''
+            targets = [row * 8 + col for row, col in KING_TARGETS[king_square]
+                       if (board[row][col] == '' or board[row][col].isupper() != white)
+                       and not is_square_attacked(board, (row, col), side)]
+            board[king_row][king_col] = king
+            for end in targets:
+                yield king_square | end << 6
+
+        if checkers == 0:
+            for move in self.castling.CASTLING_MOVES[side]:
+                if self.castling.applies(board, move, self.attacks):
+                    yield move
+
+    def _piece_moves(self, row, col, kind, white, mask, moves):
+        board = self.board
+        start = row * 8 + col
+        if kind == 'p':
+            direction = -1 if white else 1
+            ahead = row + direction
+            if not 0 <= ahead < 8:
+                return
+            targets = []
+            if board[ahead][col] == '':
+                targets.append(ahead * 8 + col)
+                if row == (6 if white else 1) and board[ahead + direction][col] == '':
+                    targets.append((ahead + direction) * 8 + col)
+            for capture_row, capture_col in PAWN_ATTACKS['w' if white else 'b'][start]:
+                target = board[capture_row][capture_col]
+                if target != '' and target.isupper() != white:
+                    targets.append(capture_row * 8 + capture_col)
+            for end in targets:
+                if mask >> end & 1:
+                    if ahead == 0 or ahead == 7:
+                        for promotion in PROMOTION_FLAGS:
+                            moves.append(start | end << 6 | promotion)
+                    else:
+                        moves.append(start | end << 6)
+        elif kind == 'n':
+            for end_row, end_col in KNIGHT_TARGETS[start]:
+                end = end_row * 8 + end_col
+                target = board[end_row][end_col]
+                if (target == '' or target.isupper() != white) and mask >> end & 1:
+                    moves.append(start | end << 6)
+        else:
+            rays = ROOK_RAYS[start] if kind == 'r' else BISHOP_RAYS[start] if kind == 'b' else RAYS[start]
+            for ray in rays:
+                for end_row, end_col in ray:
+                    end = end_row * 8 + end_col
+                    target = board[end_row][end_col]
+                    if target == '':
+                        if mask >> end & 1:
+                            moves.append(start | end << 6)
+                    else:
+                        if target.isupper() != white and mask >> end & 1:
+                            moves.append(start | end << 6)
+                        break
+
+    def _en_passant_moves(self, side, only, moves):
+        last_move = self.en_passant.last
+        if last_move is None:
+            return
+        board = self.board
+        white = side == 'w'
+        last_start, last_end = last_move & 63, last_move >> 6 & 63
+        last_end_row, last_end_col = last_end >> 3, last_end & 7
+        if abs(last_start - last_end) != 16 or board[last_end_row][last_end_col] != ('p' if white else 'P'):
+            return
+        target = (last_start + last_end) // 2
+        for col in (last_end_col - 1, last_end_col + 1):
+            start = last_end_row * 8 + col
+            if 0 <= col < 8 and board[last_end_row][col] == ('P' if white else 'p') and only in (None, start):
+                # the captured pawn leaves the rank too, so test the resulting position directly
+                move = start | target << 6
+                if not self.move_causes_check(move, side):
+                    moves.append(move)
 
     def _invalid_move(self, move) -> bool:
         """
@@ -155,38 +932,30 @@ class ChessLogic:
         # set side
         is_self = lambda p: p.isupper() if side == 'w' else p.islower()
 
-        if self.castling.applies(board, move) or self.en_passant.applies(board, move):
+        attacks = self.attacks if board is self.board else None
+        if self.castling.applies(board, move, attacks) or self.en_passant.applies(board, move):
             return False
 
-        # Add debug prints
-        print(f"Checking move: {move}")
-        print(f"Side to move: {side}")
-        start_piece = get_piece(board, move[:2])
-        print(f"Moving piece: {start_piece}")
         dest_piece = get_piece(board, move[2:])
-        print(f"Destination piece: {dest_piece}")
-        print(f"Is self piece check: {is_self(dest_piece) if dest_piece else False}")
-
         if dest_piece and is_self(dest_piece):
-            print("moving on top of another piece")
+            if self.trace is not None:
+                self.trace("invalid_move", {"move": move, "side": side, "piece": get_piece(board, move[:2]),
+                                            "reason": "own piece on destination"})
             return True
 
         causes_check = self.move_causes_check(move, side)
         invalid_move = invalid_move_for_piece(board, move, side)
-
-        # if causes_check:
-        #     print("causes check")
-        # if invalid_move:
-        #     print("invalid move for piece")
+        if self.trace is not None:
+            self.trace("invalid_move", {"move": move, "side": side, "piece": get_piece(board, move[:2]),
+                                        "causes_check": causes_check, "invalid_for_piece": invalid_move})
 
         return causes_check or invalid_move
 
-    def _handle_move_capture(self, starting, ending):
+    def _move_notation(self, starting, ending):
         chess_notation = (f"{get_piece(self.board, starting).lower() if get_piece(self.board, starting).lower() != 'p' else ''}"
                           f"{starting}"
                           f"{'x' if get_piece(self.board, ending) != '' else ''}"
                           f"{ending}")
-        move_piece(self.board, starting, ending)
         return chess_notation
 
     def white_king_checked(self, board, white_king_index) -> bool:
@@ -201,8 +970,13 @@ class ChessLogic:
         row = str(8 - white_king_index[0])
         col = chr(ord('a') + white_king_index[1])
         square = col + row
-        print(f"White king is at square: {square}")
-        return is_square_attacked(board, square, "w")
+        if board is self.board:
+            checked = self.attacks.attacked(white_king_index[0] * 8 + white_king_index[1], False)
+        else:
+            checked = is_square_attacked(board, square, "w")
+        if self.trace is not None:
+            self.trace("king_checked", {"side": 'w', "square": square, "checked": checked})
+        return checked
 
     def black_king_checked(self, board, black_king_index) -> bool:
         """
@@ -216,8 +990,13 @@ class ChessLogic:
         row = str(8 - black_king_index[0])
         col = chr(ord('a') + black_king_index[1])
         square = col + row
-        print(f"Black king is at square: {square}")
-        return is_square_attacked(board, square, "b")
+        if board is self.board:
+            checked = self.attacks.attacked(black_king_index[0] * 8 + black_king_index[1], True)
+        else:
+            checked = is_square_attacked(board, square, "b")
+        if self.trace is not None:
+            self.trace("king_checked", {"side": 'b', "square": square, "checked": checked})
+        return checked
 
     def _game_over(self) -> str:
         """
@@ -234,6 +1013,9 @@ class ChessLogic:
 
                 '' - Game In Progress
         """
+        # these draws are constant time lookups, and a position with them cannot be checkmate
+        if self.is_threefold_repetition() or self.is_insufficient_material():
+            return 'd'
         is_king_checked = self.white_king_checked(self.board, self.white_king_index) if self.turn == 'w' else self.black_king_checked(self.board, self.black_king_index)
         no_valid_moves = self._no_valid_moves(self.turn)
         #print(f'{self.turn}: is_king_checked: {is_king_checked}, no_valid_moves: {no_valid_moves}')
@@ -241,51 +1023,46 @@ class ChessLogic:
             return 'w' if self.turn == 'b' else 'b'
         elif (not is_king_checked) and no_valid_moves:
             return 'd'
+        # checkmate on the move that reaches the fifty-move limit still wins
+        if self.is_fifty_move_rule():
+            return 'd'
         return ''
 
+    def is_threefold_repetition(self) -> bool:
+        """
+        Returns:
+            bool: True if the current position occurred at least three times, same side to move,
+            castling rights and en passant possibility
+        """
+        return self._repetitions.get(self.hash, 0) >= 3
+
+    def is_fifty_move_rule(self) -> bool:
+        """
+        Returns:
+            bool: True if fifty moves by each side have been played without a capture or a pawn move
+        """
+        return self.halfmove_clock >= 100
+
+    def is_insufficient_material(self) -> bool:
+        """
+        Function to check from the piece counts whether neither side can checkmate.
+        That is the case with bare kings or a single knight or bishop left on the board
+
+        Returns:
+            bool: True if there is not enough material to checkmate
+        """
+        squares = self.piece_squares
+        if squares['P'] or squares['p'] or squares['R'] or squares['r'] or squares['Q'] or squares['q']:
+            return False
+        return len(squares['N']) + len(squares['n']) + len(squares['B']) + len(squares['b']) <= 1
+
     def _no_valid_moves(self, side):
         """
-        Function to check if there are no valid moves for a side
+        Function to check if there are no valid moves for a side. Stops at the first legal move
+        found by _staged_legal_moves
         Args:
             side: The side to check for
         Returns:
             True if there are no valid moves, else False
         """
-        is_self = lambda p: p.isupper() if side == 'w' else p.islower()
-        for i in range(8):
-            for j in range(8):
-                piece = self.board[i][j]
-                if piece == "" or not is_self(piece):
-                    continue
-
-                piece = piece.lower()
-                print(f"Piece: {piece}")
-                if piece == 'p':
-                    move_set = pawn_moves(self.board, i, j, side)
-                elif piece == 'r':
-                    move_set = rook_moves(self.board, i, j, side)
-                elif piece == 'n':
-                    move_set = knight_moves(self.board, i, j, side)
-                elif piece == 'b':
-                    move_set = bishop_moves(self.board, i, j, side)
-                elif piece == 'q':
-                    move_set = queen_moves(self.board, i, j, side)
-                elif piece == 'k':
-                    move_set = king_moves(self.board, i, j, side)
-                else:
-                    raise Exception("Unhandled piece")
-
-                for move in move_set:
-                    print(f"Checking move: {index2str((i, j)) + index2str(move)}")
-                    if not self.invalid_move(self.board, index2str((i, j)) + index2str(move), side):
-                        #print(f'valid move: {index2str((i, j)) + index2str(move)}')
-                        return False
-
-        if side == 'w':
-            if self.castling.applies(self.board, "e1g1") or self.castling.applies(self.board, "e1c1"):
-                return False
-        elif side == 'b':
-            if self.castling.applies(self.board, "e8g8") or self.castling.applies(self.board, "e8c8"):
-                return False
-
-        return True
+        return next(self._staged_legal_moves(side), None) is None
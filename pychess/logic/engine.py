@@ -0,0 +1,420 @@
+import argparse
+import time
+
+from .chess_logic import ChessLogic
+from .board_utils import move_name
+from .transposition import TranspositionTable, EXACT, LOWER, UPPER
+
+# piece values in centipawns by lowercase piece character, for move ordering
+PIECE_VALUES = {'p': 100, 'n': 320, 'b': 330, 'r': 500, 'q': 900, 'k': 0}
+# score of a checkmate at the root, mates further away score lower by one per ply
+MATE_SCORE = 100000
+# scores beyond this are mates
+MATE_BOUND = MATE_SCORE - 1000
+# depth searched when neither a depth nor a time limit is given
+DEFAULT_DEPTH = 4
+MAX_DEPTH = 64
+# the clock, node budget and stop event are polled once every this many nodes
+CHECK_INTERVAL = 1024
+# transposition table size when the engine makes its own
+DEFAULT_TABLE_MB = 16
+
+
+class _SearchTimeout(Exception):
+    """
+    Raised inside the search when a limit is reached or it is stopped, to unwind to the root
+    """
+
+
+class CancellationToken:
+    __slots__ = ("_cancelled",)
+
+    def __init__(self):
+        """
+        Flag to stop a running search from another thread, i.e. when the user moves or closes the window.
+        It has the is_set() method of threading.Event, so either can be passed as the stop argument of Engine.search
+        """
+        self._cancelled = False
+
+    def cancel(self):
+        self._cancelled = True
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled
+
+    def is_set(self) -> bool:
+        return self._cancelled
+
+
+class SearchResult:
+    __slots__ = ("move", "score", "depth", "nodes", "elapsed")
+
+    def __init__(self, move, score: int, depth: int, nodes: int, elapsed: float):
+        """
+        Outcome of a search
+
+        Args:
+            move: best move, packed (see board_utils.pack_move), None if the side to move has no legal move
+            score (int): score in centipawns from the side to move, +-MATE_SCORE minus the distance for mates
+            depth (int): depth of the deepest completed iteration
+            nodes (int): number of positions searched, quiescence included
+            elapsed (float): search time in seconds
+        """
+        self.move = move
+        self.score = score
+        self.depth = depth
+        self.nodes = nodes
+        self.elapsed = elapsed
+
+    @property
+    def nps(self) -> float:
+        """
+        Nodes searched per second
+        """
+        return self.nodes / max(self.elapsed, 1e-9)
+
+    @property
+    def move_name(self) -> str | None:
+        """
+        The best move in the play_move format, None if there is none
+        """
+        return None if self.move is None else move_name(self.move)
+
+    def __repr__(self):
+        return (f"SearchResult(move={self.move_name!r}, score={self.score}, depth={self.depth}, "
+                f"nodes={self.nodes}, elapsed={self.elapsed:.3f})")
+
+
+def print_info(result: SearchResult):
+    """
+    Info callback printing every completed iteration on one line, see Engine.search
+    """
+    print(f"depth {result.depth:>2}  score {result.score:>7}  nodes {result.nodes:>9}  "
+          f"time {result.elapsed:7.2f}s  nps {result.nps:9.0f}  move {result.move_name}")
+
+
+class Engine:
+    def __init__(self, logic: ChessLogic, table: TranspositionTable | None = None):
+        """
+        Negamax alpha-beta search with iterative deepening and a quiescence search on captures.
+        Moves are made and taken back on the ChessLogic object with make_move / unmake_move,
+        it is left as it was found when the search returns
+
+        Args:
+            logic (ChessLogic): the position to search
+            table (TranspositionTable | None): table to cache search results in, one of DEFAULT_TABLE_MB
+                is made when None. Passing the same table to later searches lets them reuse its results
+        """
+        self.logic = logic
+        self.table = TranspositionTable(DEFAULT_TABLE_MB) if table is None else table
+        self.nodes = 0
+        self._deadline = None
+        self._node_limit = None
+        self._stop = None
+        # node count at which the limits are polled next
+        self._next_check = CHECK_INTERVAL
+        # best move of the previous iteration, searched first at the root
+        self._root_best = None
+        # best move and score of the current iteration so far, None until its first root move is searched
+        self._iteration_best = None
+        self._iteration_score = 0
+
+    def evaluate(self) -> int:
+        """
+        Function to evaluate the position statically, see ChessLogic.evaluate
+
+        Returns:
+            int: Score in centipawns from the point of view of the side to move
+        """
+        score = self.logic.evaluate()
+        return score if self.logic.turn == 'w' else -score
+
+    def search(self, depth: int | None = None, time_limit: float | None = None, info=None,
+               start_depth: int = 1, stop=None, soft_limit: float | None = None, deadline: float | None = None,
+               node_limit: int | None = None) -> SearchResult:
+        """
+        Function to find the best move by iterative deepening, searching depth 1, 2, ... until the depth is
+        reached, a time or node limit is hit or the search is stopped. It can be interrupted at any point and
+        still returns the best move found so far: the result of the last completed iteration, or a better root
+        move of the interrupted iteration, as every root move that raises the best score was searched in full.
+        The limits are polled every CHECK_INTERVAL nodes, so they cost a counter comparison per node
+
+        Args:
+            depth (int | None): maximum depth in plies, DEFAULT_DEPTH if no depth, time or node limit is given
+            time_limit (float | None): hard limit in seconds, the search stops once it is exceeded
+            info: None, or a callable info(result) receiving the SearchResult of every completed iteration,
+                i.e. print_info
+            start_depth (int): depth of the first iteration
+            stop: None, or a cancellation token: an object whose is_set() returns True once the search should stop
+                (CancellationToken or threading.Event)
+            soft_limit (float | None): seconds after which no new iteration is started, as it would
+                most likely not complete before the hard limit
+            deadline (float | None): hard limit as a time.perf_counter() value, the earlier of deadline and
+                time_limit applies
+            node_limit (int | None): number of nodes after which the search stops
+
+        Returns:
+            SearchResult: the best move and its score
+        """
+        logic = self.logic
+        start = time.perf_counter()
+        if time_limit is not None:
+            deadline = start + time_limit if deadline is None else min(deadline, start + time_limit)
+        if depth is None:
+            depth = DEFAULT_DEPTH if deadline is None and node_limit is None else MAX_DEPTH
+        self._deadline = deadline
+        self._node_limit = node_limit
+        self._stop = stop
+        self.nodes = 0
+        self._next_check = CHECK_INTERVAL if node_limit is None else min(CHECK_INTERVAL, node_limit)
+        self._root_best = None
+        self.table.new_search()
+        root_ply = logic._ply
+
+        moves = logic._generate_legal_moves()
+        # without a completed iteration the first legal move is still better than nothing
+        result = SearchResult(moves[0] if moves else None, 0, 0, 0, 0.0)
+        if not moves:
+            king_row, king_col = logic.white_king_index if logic.turn == 'w' else logic.black_king_index
+            if logic.attacks.attacked(king_row * 8 + king_col, logic.turn == 'b'):
+                result.score = -MATE_SCORE
+            return result
+
+        for current in range(start_depth, depth + 1):
+            self._iteration_best = None
+            try:
+                score = self._negamax(current, -MATE_SCORE - 1, MATE_SCORE + 1, 0)
+            except _SearchTimeout:
+                while logic._ply > root_ply:
+                    logic.unmake_move()
+                # the previous best move is searched first, a different best of this iteration beat it
+                if self._iteration_best is not None and (result.depth == 0 or self._iteration_best != result.move):
+                    result = SearchResult(self._iteration_best, self._iteration_score, result.depth, 0, 0.0)
+                break
+            result = SearchResult(self._root_best, score, current, self.nodes, time.perf_counter() - start)
+            if info is not None:
+                info(result)
+            # a forced mate will not change with more depth
+            if abs(score) >= MATE_BOUND:
+                break
+            if soft_limit is not None and time.perf_counter() - start >= soft_limit:
+                break
+        result.nodes = self.nodes
+        result.elapsed = time.perf_counter() - start
+        return result
+
+    def _tick(self):
+        self.nodes += 1
+        if self.nodes >= self._next_check:
+            self._poll()
+
+    def _poll(self):
+        """
+        Check the limits and the stop event, raising _SearchTimeout if one is reached
+        """
+        if (self._deadline is not None and time.perf_counter() > self._deadline) or \
+                (self._stop is not None and self._stop.is_set()):
+            raise _SearchTimeout()
+        if self._node_limit is not None:
+            if self.nodes >= self._node_limit:
+                raise _SearchTimeout()
+            self._next_check = min(self.nodes + CHECK_INTERVAL, self._node_limit)
+        else:
+            self._next_check = self.nodes + CHECK_INTERVAL
+
+    def _in_check(self) -> bool:
+        logic = self.logic
+        king_row, king_col = logic.white_king_index if logic.turn == 'w' else logic.black_king_index
+        return logic.attacks.attacked(king_row * 8 + king_col, logic.turn == 'b')
+
+    def _is_draw(self) -> bool:
+        logic = self.logic
+        # a position repeated once inside the search is scored as the draw it can be forced into
+        return (logic._repetitions[logic.hash] >= 2 or logic.is_fifty_move_rule()
+                or logic.is_insufficient_material())
+
+    def _order_moves(self, moves, first=None) -> list[int]:
+        """
+        Sort moves by MVV-LVA, captures of the most valuable victim by the least valuable attacker first,
+        then promotions, then quiet moves. The move given as first goes before all others
+        """
+        board = self.logic.board
+        scored = []
+        for move in moves:
+            start, end = move & 63, move >> 6 & 63
+            victim = board[end >> 3][end & 7]
+            attacker = board[start >> 3][start & 7].lower()
+            score = 0
+            if victim != '':
+                score = 10 * PIECE_VALUES[victim.lower()] - PIECE_VALUES[attacker] + 10000
+            elif attacker == 'p' and (start ^ end) & 7:
+                # en passant
+                score = 9 * PIECE_VALUES['p'] + 10000
+            if move >> 12:
+                score += PIECE_VALUES['nbrq'[(move >> 12) - 1]]
+            if move == first:
+                score = 1 << 30
+            scored.append((score, move))
+        scored.sort(reverse=True)
+        return [move for _, move in scored]
+
+    def _negamax(self, depth: int, alpha: int, beta: int, ply: int) -> int:
+        logic = self.logic
+        self._tick()
+        if ply > 0 and self._is_draw():
+            return 0
+        if depth <= 0:
+            return self._quiescence(alpha, beta, ply)
+
+        table = self.table
+        key = logic.hash
+        entry = table.probe(key)
+        table_move = None
+        if entry is not None:
+            table_move, score, entry_depth, bound = entry
+            if ply > 0 and entry_depth >= depth:
+                score = _score_from_table(score, ply)
+                if (bound == EXACT or (bound == LOWER and score >= beta)
+                        or (bound == UPPER and score <= alpha)):
+                    return score
+
+        moves = logic._generate_legal_moves(moves=logic._move_buffer())
+        if not moves:
+            return -MATE_SCORE + ply if self._in_check() else 0
+
+        original_alpha = alpha
+        best = -MATE_SCORE - 1
+        best_found = 0
+        for move in self._order_moves(moves, self._root_best if ply == 0 else table_move):
+            logic.make_move(move)
+            score = -self._negamax(depth - 1, -beta, -alpha, ply + 1)
+            logic.unmake_move()
+            if score > best:
+                best = score
+                best_found = move
+                if ply == 0:
+                    self._root_best = move
+                    self._iteration_best = move
+                    self._iteration_score = score
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        break
+
+        bound = UPPER if best <= original_alpha else LOWER if best >= beta else EXACT
+        table.store(key, best_found, _score_to_table(best, ply), depth, bound)
+        return best
+
+    def _quiescence(self, alpha: int, beta: int, ply: int) -> int:
+        """
+        Search captures and promotions only until the position is quiet, so that the static evaluation
+        is never taken in the middle of an exchange. When in check every evasion is searched instead
+        """
+        logic = self.logic
+        in_check = self._in_check()
+        if in_check:
+            best = -MATE_SCORE + ply
+        else:
+            # standing pat, the side to move does not have to capture
+            best = self.evaluate()
+            if best >= beta:
+                return best
+            alpha = max(alpha, best)
+
+        moves = logic._generate_legal_moves(moves=logic._move_buffer())
+        if not moves:
+            return best if in_check else 0
+        board = logic.board
+        if not in_check:
+            moves = [move for move in moves
+                     if board[move >> 9 & 7][move >> 6 & 7] != '' or move >> 12 or (move ^ move >> 6) & 7
+                     and board[move >> 3 & 7][move & 7].lower() == 'p']
+        for move in self._order_moves(moves):
+            logic.make_move(move)
+            self._tick()
+            score = -self._quiescence(-beta, -alpha, ply + 1)
+            logic.unmake_move()
+            if score > best:
+                best = score
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        break
+        return best
+
+
+def _score_to_table(score: int, ply: int) -> int:
+    """
+    Mate scores count the plies from the root, the table stores them counted from the position instead
+    """
+    if score >= MATE_BOUND:
+        return score + ply
+    if score <= -MATE_BOUND:
+        return score - ply
+    return score
+
+
+def _score_from_table(score: int, ply: int) -> int:
+    if score >= MATE_BOUND:
+        return score - ply
+    if score <= -MATE_BOUND:
+        return score + ply
+    return score
+
+
+def best_move(position, depth: int | None = None, time_limit: float | None = None, node_limit: int | None = None,
+              stop=None) -> str | None:
+    """
+    Function to pick a move for the side to move
+
+    Args:
+        position (ChessLogic) or (str): the position, as a ChessLogic object (left unchanged) or a FEN string
+        depth (int | None): maximum search depth in plies, see Engine.search
+        time_limit (float | None): seconds to search for, see Engine.search
+        node_limit (int | None): number of nodes to search, see Engine.search
+        stop: None, or a CancellationToken to stop the search early, see Engine.search
+
+    Returns:
+        str | None: The move in the play_move format (promotions have the piece appended, i.e. e7e8q),
+        None if there is no legal move
+    """
+    if isinstance(position, str):
+        position = ChessLogic.from_fen(position)
+    return Engine(position).search(depth, time_limit, stop=stop, node_limit=node_limit).move_name
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Search a position and print every iteration with its speed")
+    parser.add_argument("--fen", default="rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1",
+                        help="position to search (default the initial position)")
+    parser.add_argument("--depth", type=int, default=None, help=f"maximum depth (default {DEFAULT_DEPTH})")
+    parser.add_argument("--time", type=float, default=None, help="hard time limit in seconds")
+    parser.add_argument("--soft", type=float, default=None, help="seconds after which no new iteration is started")
+    parser.add_argument("--nodes", type=int, default=None, help="node budget")
+    parser.add_argument("--backend", choices=["list", "bitboard"], default="list", help="board backend (default list)")
+
+    parser.add_argument("--hash", type=float, default=DEFAULT_TABLE_MB,
+                        help=f"transposition table size in MB (default {DEFAULT_TABLE_MB})")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="number of processes for a lazy SMP search (default 1)")
+    parser.add_argument("--scaling", action="store_true",
+                        help="time the search to --depth with 1, 2, 4, ... up to --workers processes and print the speedup")
+    args = parser.parse_args()
+
+    if args.workers > 1 or args.scaling:
+        from .parallel import lazy_smp_search, smp_scaling
+        logic = ChessLogic.from_fen(args.fen, args.backend)
+        if args.scaling:
+            smp_scaling(logic, args.depth or DEFAULT_DEPTH, args.workers, args.hash)
+        else:
+            result = lazy_smp_search(logic, args.depth, args.time, args.workers, args.hash)
+            print(f"bestmove {result.move_name}  depth {result.depth}  {result.nodes} nodes  {result.nps:.0f} nodes/s")
+        raise SystemExit(0)
+
+    engine = Engine(ChessLogic.from_fen(args.fen, args.backend), TranspositionTable(args.hash))
+    result = engine.search(args.depth, args.time, print_info, soft_limit=args.soft, node_limit=args.nodes)
+    table = engine.table
+    print(f"bestmove {result.move_name}  {result.nodes} nodes  {result.nps:.0f} nodes/s")
+    print(f"table {table.memory / (1 << 20):.1f} MB  {table.buckets} buckets  hit rate {table.hit_rate:.1%}  "
+          f"usage {table.usage():.1%}")
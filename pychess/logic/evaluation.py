@@ -0,0 +1,147 @@
+# Material and piece-square tables for the static evaluation, tapered between the middlegame and the endgame.
+#
+# The square tables are written from white's point of view with rank 8 on top, which is the square
+# index order (row * 8 + col), black reads them mirrored (square ^ 56). MG_TABLES and EG_TABLES hold
+# material plus square bonus for every piece character and square, positive for white and negative
+# for black, so a position scores as the plain sum over its pieces and a move changes it by a few
+# table lookups (see ChessLogic.make_move).
+
+# material in centipawns by lowercase piece character
+MG_VALUES = {'p': 82, 'n': 337, 'b': 365, 'r': 477, 'q': 1025, 'k': 0}
+EG_VALUES = {'p': 94, 'n': 281, 'b': 297, 'r': 512, 'q': 936, 'k': 0}
+
+# game phase contributed by each piece, the phase is MAX_PHASE with all pieces on the board and 0 with
+# only kings and pawns left
+PHASE_WEIGHTS = {'p': 0, 'n': 1, 'b': 1, 'r': 2, 'q': 4, 'k': 0}
+MAX_PHASE = 24
+
+PAWN = (
+      0,   0,   0,   0,   0,   0,   0,   0,
+     50,  50,  50,  50,  50,  50,  50,  50,
+     10,  10,  20,  30,  30,  20,  10,  10,
+      5,   5,  10,  25,  25,  10,   5,   5,
+      0,   0,   0,  20,  20,   0,   0,   0,
+      5,  -5, -10,   0,   0, -10,  -5,   5,
+      5,  10,  10, -20, -20,  10,  10,   5,
+      0,   0,   0,   0,   0,   0,   0,   0,
+)
+# in the endgame a pawn is worth more the closer it is to promotion
+PAWN_ENDGAME = (
+      0,   0,   0,   0,   0,   0,   0,   0,
+     80,  80,  80,  80,  80,  80,  80,  80,
+     50,  50,  50,  50,  50,  50,  50,  50,
+     30,  30,  30,  30,  30,  30,  30,  30,
+     15,  15,  15,  15,  15,  15,  15,  15,
+      5,   5,   5,   5,   5,   5,   5,   5,
+      0,   0,   0,   0,   0,   0,   0,   0,
+      0,   0,   0,   0,   0,   0,   0,   0,
+)
+KNIGHT = (
+    -50, -40, -30, -30, -30, -30, -40, -50,
+    -40, -20,   0,   0,   0,   0, -20, -40,
+    -30,   0,  10,  15,  15,  10,   0, -30,
+    -30,   5,  15,  20,  20,  15,   5, -30,
+    -30,   0,  15,  20,  20,  15,   0, -30,
+    -30,   5,  10,  15,  15,  10,   5, -30,
+    -40, -20,   0,   5,   5,   0, -20, -40,
+    -50, -40, -30, -30, -30, -30, -40, -50,
+)
+BISHOP = (
+    -20, -10, -10, -10, -10, -10, -10, -20,
+    -10,   0,   0,   0,   0,   0,   0, -10,
+    -10,   0,   5,  10,  10,   5,   0, -10,
+    -10,   5,   5,  10,  10,   5,   5, -10,
+    -10,   0,  10,  10,  10,  10,   0, -10,
+    -10,  10,  10,  10,  10,  10,  10, -10,
+    -10,   5,   0,   0,   0,   0,   5, -10,
+    -20, -10, -10, -10, -10, -10, -10, -20,
+)
+ROOK = (
+      0,   0,   0,   0,   0,   0,   0,   0,
+      5,  10,  10,  10,  10,  10,  10,   5,
+     -5,   0,   0,   0,   0,   0,   0,  -5,
+     -5,   0,   0,   0,   0,   0,   0,  -5,
+     -5,   0,   0,   0,   0,   0,   0,  -5,
+     -5,   0,   0,   0,   0,   0,   0,  -5,
+     -5,   0,   0,   0,   0,   0,   0,  -5,
+      0,   0,   0,   5,   5,   0,   0,   0,
+)
+QUEEN = (
+    -20, -10, -10,  -5,  -5, -10, -10, -20,
+    -10,   0,   0,   0,   0,   0,   0, -10,
+    -10,   0,   5,   5,   5,   5,   0, -10,
+     -5,   0,   5,   5,   5,   5,   0,  -5,
+      0,   0,   5,   5,   5,   5,   0,  -5,
+    -10,   5,   5,   5,   5,   5,   0, -10,
+    -10,   0,   5,   0,   0,   0,   0, -10,
+    -20, -10, -10,  -5,  -5, -10, -10, -20,
+)
+# the king shelters behind its pawns in the middlegame and heads for the centre in the endgame
+KING = (
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -20, -30, -30, -40, -40, -30, -30, -20,
+    -10, -20, -20, -20, -20, -20, -20, -10,
+     20,  20,   0,   0,   0,   0,  20,  20,
+     20,  30,  10,   0,   0,  10,  30,  20,
+)
+KING_ENDGAME = (
+    -50, -40, -30, -20, -20, -30, -40, -50,
+    -30, -20, -10,   0,   0, -10, -20, -30,
+    -30, -10,  20,  30,  30,  20, -10, -30,
+    -30, -10,  30,  40,  40,  30, -10, -30,
+    -30, -10,  30,  40,  40,  30, -10, -30,
+    -30, -10,  20,  30,  30,  20, -10, -30,
+    -30, -30,   0,   0,   0,   0, -30, -30,
+    -50, -30, -30, -30, -30, -30, -30, -50,
+)
+
+MG_SQUARES = {'p': PAWN, 'n': KNIGHT, 'b': BISHOP, 'r': ROOK, 'q': QUEEN, 'k': KING}
+EG_SQUARES = {'p': PAWN_ENDGAME, 'n': KNIGHT, 'b': BISHOP, 'r': ROOK, 'q': QUEEN, 'k': KING_ENDGAME}
+
+
+def _piece_tables(values, squares) -> dict[str, tuple[int, ...]]:
+    tables = {}
+    for kind in "pnbrqk":
+        tables[kind.upper()] = tuple(values[kind] + squares[kind][square] for square in range(64))
+        tables[kind] = tuple(-(values[kind] + squares[kind][square ^ 56]) for square in range(64))
+    return tables
+
+
+MG_TABLES = _piece_tables(MG_VALUES, MG_SQUARES)
+EG_TABLES = _piece_tables(EG_VALUES, EG_SQUARES)
+PHASES = {piece: PHASE_WEIGHTS[piece.lower()] for piece in "PNBRQKpnbrqk"}
+
+
+def score_board(board) -> tuple[int, int, int]:
+    """
+    Function to compute the evaluation terms of a position from scratch
+
+    Args:
+        board: 2D list representing the chess board, or Bitboard
+
+    Returns:
+        tuple[int, int, int]: middlegame score, endgame score (both positive when white is better) and phase
+    """
+    mg = eg = phase = 0
+    for row in range(8):
+        for col in range(8):
+            piece = board[row][col]
+            if piece != '':
+                mg += MG_TABLES[piece][row * 8 + col]
+                eg += EG_TABLES[piece][row * 8 + col]
+                phase += PHASES[piece]
+    return mg, eg, phase
+
+
+def tapered(mg: int, eg: int, phase: int) -> int:
+    """
+    Function to blend the middlegame and endgame scores by game phase
+
+    Returns:
+        int: Score in centipawns, positive when white is better
+    """
+    phase = min(phase, MAX_PHASE)
+    return (mg * phase + eg * (MAX_PHASE - phase)) // MAX_PHASE
@@ -0,0 +1,196 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+
+from .chess_logic import ChessLogic
+from .engine import Engine, SearchResult, DEFAULT_TABLE_MB
+from .transposition import TranspositionTable
+
+# the shared block of a lazy SMP search starts with the stop flag, the transposition table follows
+_FLAG_BYTES = 64
+
+
+def _perft_task(logic: ChessLogic, move: str, depth: int) -> int:
+    logic.make_move(move)
+    nodes = logic.perft(depth - 1)
+    logic.unmake_move()
+    return nodes
+
+
+def worker_counts(max_workers: int) -> list[int]:
+    """
+    Worker counts to time a scaling run with: 1, 2, 4, ... and max_workers itself
+
+    Args:
+        max_workers (int): the largest count
+
+    Returns:
+        list[int]: The counts in increasing order
+    """
+    counts = [1]
+    while counts[-1] * 2 <= max_workers:
+        counts.append(counts[-1] * 2)
+    if counts[-1] != max_workers:
+        counts.append(max_workers)
+    return counts
+
+
+def _run_task(task, snapshot: str, backend: str, moves: list[str], args: tuple) -> dict:
+    """
+    Worker side of run_per_root_move, the position is rebuilt from its snapshot once per batch of moves
+    """
+    logic = ChessLogic.from_snapshot(snapshot, backend)
+    return {move: task(logic, move, *args) for move in moves}
+
+
+def run_per_root_move(logic: ChessLogic, task, *args, workers: int | None = None, moves=None) -> dict:
+    """
+    Function to run an analysis task below every root move, splitting the moves across worker processes.
+    The workers receive ChessLogic.snapshot of the position instead of a pickled ChessLogic object
+
+    Args:
+        logic (ChessLogic): the root position, it is not modified
+        task: module level function task(logic, move, *args) -> result. It must leave the position
+            as it found it (i.e. make_move / unmake_move)
+        *args: extra arguments passed to the task
+        workers (int | None): number of processes, defaults to the number of cores
+        moves: root moves to analyse, defaults to all legal moves
+
+    Returns:
+        dict: The task result for every root move
+    """
+    if moves is None:
+        moves = logic.legal_moves()
+    workers = workers or os.cpu_count() or 1
+    snapshot = logic.snapshot()
+    backend = logic.backend
+    if workers == 1 or len(moves) <= 1:
+        return _run_task(task, snapshot, backend, moves, args)
+
+    # several small batches per worker so that an expensive move does not hold up the others
+    batches = [moves[i::workers * 4] for i in range(min(len(moves), workers * 4))]
+    results = {}
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        count = len(batches)
+        for batch_result in executor.map(_run_task, [task] * count, [snapshot] * count, [backend] * count,
+                                         batches, [args] * count):
+            results.update(batch_result)
+    return results
+
+
+def parallel_perft_divide(logic: ChessLogic, depth: int, workers: int | None = None) -> dict[str, int]:
+    """
+    Same as ChessLogic.perft_divide, with the root moves split across worker processes
+
+    Args:
+        logic (ChessLogic): the root position
+        depth (int): number of plies to search, including the root move
+        workers (int | None): number of processes, defaults to the number of cores
+
+    Returns:
+        dict[str, int]: Number of leaf nodes for each legal root move
+    """
+    if depth <= 0:
+        return {}
+    return run_per_root_move(logic, _perft_task, depth, workers=workers)
+
+
+def parallel_perft(logic: ChessLogic, depth: int, workers: int | None = None) -> int:
+    """
+    Same as ChessLogic.perft, with the root moves split across worker processes
+    """
+    if depth <= 0:
+        return 1
+    return sum(parallel_perft_divide(logic, depth, workers).values())
+
+
+class _SharedFlag:
+    """
+    Stop flag in the first byte of a shared memory block, with the threading.Event methods the engine polls
+    """
+    __slots__ = ("buffer",)
+
+    def __init__(self, buffer):
+        self.buffer = buffer
+
+    def is_set(self) -> bool:
+        return self.buffer[0] != 0
+
+    def set(self):
+        self.buffer[0] = 1
+
+
+def _smp_worker(snapshot: str, backend: str, name: str, depth: int | None, time_limit: float | None,
+                start_depth: int, main: bool) -> tuple:
+    """
+    Worker side of lazy_smp_search, one iterative deepening search on the shared table.
+    The main worker stops the others when it completes its last iteration
+    """
+    shared = SharedMemory(name)
+    view = shared.buf[_FLAG_BYTES:]
+    table = TranspositionTable(buffer=view)
+    flag = _SharedFlag(shared.buf)
+    try:
+        logic = ChessLogic.from_snapshot(snapshot, backend)
+        result = Engine(logic, table).search(depth, time_limit, start_depth=start_depth, stop=flag)
+        if main:
+            flag.set()
+        return result.move, result.score, result.depth, result.nodes
+    finally:
+        table.close()
+        view.release()
+        flag.buffer = None
+        shared.close()
+
+
+def lazy_smp_search(logic: ChessLogic, depth: int | None = None, time_limit: float | None = None,
+                    workers: int | None = None, table_mb: float = DEFAULT_TABLE_MB) -> SearchResult:
+    """
+    Function to search a position with several worker processes (lazy SMP). Every worker runs iterative
+    deepening on the same root, half of them starting one ply deeper so they do not move in lockstep, and
+    they share one transposition table in multiprocessing.shared_memory, so each finds the results of the
+    others. The search ends when the main worker completes its last iteration or the time runs out
+
+    Args:
+        logic (ChessLogic): the root position, it is not modified
+        depth (int | None): maximum depth in plies, see Engine.search
+        time_limit (float | None): seconds to search for, see Engine.search
+        workers (int | None): number of processes, defaults to the number of cores
+        table_mb (float): size of the shared transposition table in megabytes
+
+    Returns:
+        SearchResult: the result of the deepest completed iteration of any worker (the main one on a tie),
+        with the nodes of all workers
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        return Engine(logic, TranspositionTable(table_mb)).search(depth, time_limit)
+
+    snapshot = logic.snapshot()
+    backend = logic.backend
+    start = time.perf_counter()
+    shared = SharedMemory(create=True, size=_FLAG_BYTES + int(table_mb * (1 << 20)))
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(_smp_worker, snapshot, backend, shared.name, depth, time_limit,
+                                       1 + i % 2, i == 0) for i in range(workers)]
+            results = [future.result() for future in futures]
+    finally:
+        shared.close()
+        shared.unlink()
+    # max keeps the first of equal depths, so the main worker wins ties
+    move, score, best_depth, _ = max(results, key=lambda result: result[2])
+    return SearchResult(move, score, best_depth, sum(result[3] for result in results), time.perf_counter() - start)
+
+
+def smp_scaling(logic: ChessLogic, depth: int, max_workers: int, table_mb: float = DEFAULT_TABLE_MB):
+    """
+    Time lazy_smp_search to a fixed depth with 1, 2, 4, ... up to max_workers processes and print the speedup over 1
+    """
+    base = None
+    for workers in worker_counts(max_workers):
+        result = lazy_smp_search(logic, depth, workers=workers, table_mb=table_mb)
+        base = base or result.elapsed
+        print(f"depth {depth}  {workers:>3} workers  {result.nodes:>9} nodes  {result.elapsed:8.2f}s  "
+              f"{result.nps:9.0f} nodes/s  speedup {base / max(result.elapsed, 1e-9):5.2f}x  move {result.move_name}")
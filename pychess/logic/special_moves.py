@@ -7,88 +7,167 @@ class MoveHandler:
     def handle(self, board, move):
         raise NotImplementedError
 
+# castling rights, stored together as bit flags in Castling.rights
+WHITE_KING_SIDE = 1
+WHITE_QUEEN_SIDE = 2
+BLACK_KING_SIDE = 4
+BLACK_QUEEN_SIDE = 8
+
 class Castling(MoveHandler):
+    # rook starting and ending square for each castling move of the king
+    ROOK_MOVES = {
+        "e1g1": ("h1", "f1"),
+        "e1c1": ("a1", "d1"),
+        "e8g8": ("h8", "f8"),
+        "e8c8": ("a8", "d8"),
+    }
+    # castling can also be entered by moving the king onto its rook
+    KING_MOVES = {
+        "e1h1": "e1g1",
+        "e1a1": "e1c1",
+        "e8h8": "e8g8",
+        "e8a8": "e8c8",
+    }
+    # right needed, squares that must be empty and squares the king passes that must not be attacked
+    REQUIREMENTS = {
+        "e1g1": (WHITE_KING_SIDE, ("f1", "g1"), ("e1", "f1", "g1")),
+        "e1c1": (WHITE_QUEEN_SIDE, ("b1", "c1", "d1"), ("e1", "d1", "c1")),
+        "e8g8": (BLACK_KING_SIDE, ("f8", "g8"), ("e8", "f8", "g8")),
+        "e8c8": (BLACK_QUEEN_SIDE, ("b8", "c8", "d8"), ("e8", "d8", "c8")),
+    }
+    # rights lost when a piece moves from or to a king or rook starting square
+    RIGHTS_LOST = {
+        "e1": WHITE_KING_SIDE | WHITE_QUEEN_SIDE,
+        "h1": WHITE_KING_SIDE,
+        "a1": WHITE_QUEEN_SIDE,
+        "e8": BLACK_KING_SIDE | BLACK_QUEEN_SIDE,
+        "h8": BLACK_KING_SIDE,
+        "a8": BLACK_QUEEN_SIDE,
+    }
+    # the same tables by square index, keyed by the packed king move
+    ROOK_SQUARES = {parse_move(move): (SQUARE_INDEX[rook_start], SQUARE_INDEX[rook_end])
+                    for move, (rook_start, rook_end) in ROOK_MOVES.items()}
+    REQUIREMENT_SQUARES = {parse_move(move): (right, tuple(map(SQUARE_INDEX.get, empty)), tuple(map(SQUARE_INDEX.get, safe)))
+                           for move, (right, empty, safe) in REQUIREMENTS.items()}
+    RIGHTS_LOST_BY_SQUARE = list(map(RIGHTS_LOST.get, SQUARE_NAMES, [0] * 64))
+    # packed castling moves of each side, king side first
+    CASTLING_MOVES = {'w': (parse_move("e1g1"), parse_move("e1c1")), 'b': (parse_move("e8g8"), parse_move("e8c8"))}
+
     def __init__(self):
-        self.white_castling_allowed = True
-        self.back_castling_allowed = True
+        self.rights = WHITE_KING_SIDE | WHITE_QUEEN_SIDE | BLACK_KING_SIDE | BLACK_QUEEN_SIDE
 
-    def applies(self, board, move):
-        # check if the king has moved
-        if (not self.white_castling_allowed) and get_piece(board, move[:2]).isupper():
-            return False
-        if (not self.back_castling_allowed) and get_piece(board, move[:2]).islower():
-            return False
+    @property
+    def white_castling_allowed(self):
+        return bool(self.rights & (WHITE_KING_SIDE | WHITE_QUEEN_SIDE))
 
-        # check if the path is clear
-        if move == "e1g1" or move == "e1h1":
-            # check for the king side white
-            return empty_between_horizontal(board, "e1", "h1") and not is_square_attacked(board, "g1", "w")
-        elif move == "e1c1" or move == "e1a1":
-            # check for the queen side white
-            return empty_between_horizontal(board, "e1", "a1") and not is_square_attacked(board, "c1", "w")
-        elif move == "e8g8" or move == "e8h8":
-            # check for the king side black
-            return empty_between_horizontal(board, "e8", "h8") and not is_square_attacked(board, "g8", "b")
-        elif move == "e8c8" or move == "e8a8":
-            # check for the queen side black
-            return empty_between_horizontal(board, "e8", "a8") and not is_square_attacked(board, "c8", "b")
+    @white_castling_allowed.setter
+    def white_castling_allowed(self, allowed):
+        if allowed:
+            self.rights |= WHITE_KING_SIDE | WHITE_QUEEN_SIDE
         else:
-            # not a valid castling move
+            self.rights &= ~(WHITE_KING_SIDE | WHITE_QUEEN_SIDE)
+
+    @property
+    def back_castling_allowed(self):
+        return bool(self.rights & (BLACK_KING_SIDE | BLACK_QUEEN_SIDE))
+
+    @back_castling_allowed.setter
+    def back_castling_allowed(self, allowed):
+        if allowed:
+            self.rights |= BLACK_KING_SIDE | BLACK_QUEEN_SIDE
+        else:
+            self.rights &= ~(BLACK_KING_SIDE | BLACK_QUEEN_SIDE)
+
+    def applies(self, board, move, attacks=None):
+        """
+        Args:
+            board: 2D list representing the chess board
+            move: the king move, i.e. e1g1 or e1h1, or the packed move
+            attacks: optional AttackMap of the board, the safe squares are then checked by lookup
+
+        Returns:
+            bool: True if the move is a legal castling move
+        """
+        if type(move) is str:
+            move = self.KING_MOVES.get(move, move)
+            if move not in self.REQUIREMENTS:
+                # not a valid castling move
+                return False
+            move = parse_move(move)
+        requirement = self.REQUIREMENT_SQUARES.get(move)
+        if requirement is None:
+            return False
+        right, empty_squares, safe_squares = requirement
+
+        # check if the king or the rook has moved
+        white = move & 63 == 60
+        king, rook = ("K", "R") if white else ("k", "r")
+        if not self.rights & right or get_piece(board, move & 63) != king or \
+                get_piece(board, self.ROOK_SQUARES[move][0]) != rook:
             return False
 
+        # check if the path is clear and the king does not castle out of, through or into check
+        for square in empty_squares:
+            if get_piece(board, square) != "":
+                return False
+        for square in safe_squares:
+            if attacks.attacked(square, not white) if attacks is not None else \
+                    is_square_attacked(board, square, "w" if white else "b"):
+                return False
+        return True
+
     def handle(self, board, move):
-        if move == "e1g1" or move == "e8h1":
-            board[7][4], board[7][7] = "", ""
-            board[7][6], board[7][5] = "K", "R"
-            self.white_castling_allowed = False
-        elif move == "e1c1" or move == "e8a1":
-            board[7][4], board[7][0] = "", ""
-            board[7][2], board[7][3] = "K", "R"
-            self.white_castling_allowed = False
-        elif move == "e8g8" or move == "e8h8":
-            board[0][4], board[0][7] = "", ""
-            board[0][6], board[0][5] = "k", "r"
-            self.back_castling_allowed = False
-        elif move == "e8c8" or move == "e8a8":
-            board[0][4], board[0][0] = "", ""
-            board[0][2], board[0][3] = "k", "r"
-            self.back_castling_allowed = False
+        move = self.KING_MOVES.get(move, move)
+        rook_start, rook_end = self.ROOK_MOVES[move]
+        move_piece(board, move[:2], move[2:4])
+        move_piece(board, rook_start, rook_end)
+        self.update(move)
         return "0-0" if "g" in move else "0-0-0"
 
     def update(self, move):
-        if move[2:] == "e1" or move[2:] == "a1" or move[:2] == "h8":
-            self.white_castling_allowed = False
-        elif move[2:] == "e8" or move[2:] == "a8" or move[:2] == "h8":
-            self.back_castling_allowed = False
+        """ Remove the castling rights lost by a move from or to a king or rook starting square. """
+        if type(move) is str:
+            move = parse_move(move)
+        self.rights &= ~(self.RIGHTS_LOST_BY_SQUARE[move & 63] | self.RIGHTS_LOST_BY_SQUARE[move >> 6 & 63])
 
 
 class EnPassant(MoveHandler):
     def __init__(self):
-        # Stores last move for en passant validation
-        self.last_move = None  
+        # Stores last move for en passant validation, packed (see board_utils.pack_move)
+        self.last = None
+
+    @property
+    def last_move(self):
+        """ The last move in the play_move format, None before the first move. """
+        return move_name(self.last) if self.last is not None else None
+
+    @last_move.setter
+    def last_move(self, move):
+        self.last = parse_move(move) if move else None
 
     def applies(self, board, move):
-        """ Check if the en passant move is valid. """
-        start, end = move[2:], move[:2]
-        start_col, start_row = str2index(start)
-        end_col, end_row = str2index(end)
+        """ Check if the en passant move is valid. The move is a string or a packed move. """
+        if type(move) is str:
+            move = parse_move(move)
+        start, end = move & 63, move >> 6 & 63
+        start_row, start_col = start >> 3, start & 7
+        end_row, end_col = end >> 3, end & 7
         piece = get_piece(board, start)
 
-        # Ensure it's a pawn moving diagonally
-        if piece.lower() != "p" or abs(start_col - end_col) != 1 or abs(start_row - end_row) != 1:
+        # Ensure it's a pawn moving diagonally forward
+        if piece.lower() != "p" or abs(start_col - end_col) != 1 or end_row - start_row != (-1 if piece == "P" else 1):
             return False
 
         # Check last move to see if en passant is possible
-        if self.last_move:
-            last_start, last_end = self.last_move[:2], self.last_move[2:]
-            last_start_col, last_start_row = ord(last_start[0]) - ord('a'), 8 - int(last_start[1])
-            last_end_col, last_end_row = ord(last_end[0]) - ord('a'), 8 - int(last_end[1])
+        if self.last is not None:
+            last_start, last_end = self.last & 63, self.last >> 6 & 63
+            last_end_row, last_end_col = last_end >> 3, last_end & 7
 
-            # Opponent's pawn must have moved two squares forward to be capturable
-            if ((last_start_row == (6 if piece == "p" else 1) and
+            # Opponent's pawn must have moved two squares forward, landing next to our pawn
+            if (last_start >> 3 == (6 if piece == "p" else 1) and
                 last_end_row == (4 if piece == "p" else 3) and
-                last_end_row == start_row) and
-                get_piece(board, last_end).upper() == "P"):
+                last_end_row == start_row and last_end_col == end_col and
+                get_piece(board, last_end) == ("P" if piece == "p" else "p")):
 
                 return True
 
@@ -0,0 +1,67 @@
+# Per-square lookup tables, built once at import.
+#
+# Tables are indexed by square index (row * 8 + col) and list (row, col) targets that are already
+# inside the board, so the generators in board_utils never bounds check. The *_MASKS tables hold
+# the same targets as 64 bit masks for logic.bitboard.
+
+# (row, col) steps, the rook directions come first
+ROOK_DIRECTIONS = ((-1, 0), (1, 0), (0, -1), (0, 1))
+BISHOP_DIRECTIONS = ((-1, -1), (-1, 1), (1, -1), (1, 1))
+QUEEN_DIRECTIONS = ROOK_DIRECTIONS + BISHOP_DIRECTIONS
+KNIGHT_OFFSETS = ((1, 2), (2, 1), (-1, 2), (-2, 1), (1, -2), (2, -1), (-1, -2), (-2, -1))
+# bit mask with all 64 squares set
+FULL_MASK = (1 << 64) - 1
+
+
+def _step_targets(offsets) -> list[tuple[tuple[int, int], ...]]:
+    table = []
+    for square in range(64):
+        row, col = divmod(square, 8)
+        table.append(tuple((row + dr, col + dc) for dr, dc in offsets if 0 <= row + dr < 8 and 0 <= col + dc < 8))
+    return table
+
+
+def _ray(square, direction) -> tuple[tuple[int, int], ...]:
+    row, col = divmod(square, 8)
+    ray = []
+    row, col = row + direction[0], col + direction[1]
+    while 0 <= row < 8 and 0 <= col < 8:
+        ray.append((row, col))
+        row, col = row + direction[0], col + direction[1]
+    return tuple(ray)
+
+
+def _to_masks(table) -> list[int]:
+    return [sum(1 << (row * 8 + col) for row, col in targets) for targets in table]
+
+
+KNIGHT_TARGETS = _step_targets(KNIGHT_OFFSETS)
+KING_TARGETS = _step_targets(QUEEN_DIRECTIONS)
+# squares attacked by a pawn of the given color standing on a square
+PAWN_ATTACKS = {
+    'w': _step_targets(((-1, -1), (-1, 1))),
+    'b': _step_targets(((1, -1), (1, 1))),
+}
+
+# RAYS[square][i] is the ray in QUEEN_DIRECTIONS[i], ordered outwards from the square
+RAYS = [tuple(_ray(square, direction) for direction in QUEEN_DIRECTIONS) for square in range(64)]
+ROOK_RAYS = [rays[:4] for rays in RAYS]
+BISHOP_RAYS = [rays[4:] for rays in RAYS]
+
+KNIGHT_MASKS = _to_masks(KNIGHT_TARGETS)
+KING_MASKS = _to_masks(KING_TARGETS)
+PAWN_ATTACK_MASKS = (_to_masks(PAWN_ATTACKS['w']), _to_masks(PAWN_ATTACKS['b']))
+# RAY_MASKS[i][square] is RAYS[square][i] as a mask
+RAY_MASKS = [_to_masks(rays[i] for rays in RAYS) for i in range(8)]
+RANK_MASKS = [0xFF << (8 * row) for row in range(8)]
+
+
+def _between(a: int, b: int) -> int:
+    for i in range(8):
+        if RAY_MASKS[i][a] >> b & 1:
+            return RAY_MASKS[i][a] & ~RAY_MASKS[i][b] & ~(1 << b)
+    return 0
+
+
+# squares strictly between two squares on a common line, 0 if they are not aligned
+BETWEEN = [[_between(a, b) for b in range(64)] for a in range(64)]
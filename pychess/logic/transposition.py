@@ -0,0 +1,153 @@
+# bound of a stored score
+EXACT, LOWER, UPPER = 0, 1, 2
+
+# every bucket holds two entries, a depth-preferred one and an always-replace one, of two 64 bit words each
+# (the key xored with the data, and the data), so 32 bytes per bucket
+WORDS_PER_BUCKET = 4
+BUCKET_BYTES = WORDS_PER_BUCKET * 8
+MASK_64 = (1 << 64) - 1
+
+# layout of the data word: move in bits 0-15, score + SCORE_OFFSET in bits 16-47, depth in bits 48-55,
+# bound in bits 56-57 and the search generation in bits 58-63
+SCORE_OFFSET = 1 << 31
+
+
+class TranspositionTable:
+    def __init__(self, size_mb: float = 16, buffer=None):
+        """
+        Table of search results keyed by Zobrist hash, stored in one preallocated flat buffer of 64 bit words
+        rather than a dict of objects, so its size is fixed up front and it can live in shared memory.
+
+        Entries are stored as (key ^ data, data): a reader sees a wrong key, and therefore a miss, if another
+        process was writing the entry at the same time, so the table needs no lock.
+
+        Args:
+            size_mb (float): memory budget in megabytes, the table uses the largest power of two number of
+                buckets that fits
+            buffer: optional writable buffer (i.e. bytearray or multiprocessing.shared_memory.SharedMemory.buf)
+                to store the table in instead of allocating one, size_mb is then ignored and the table spans
+                the whole buffer rounded down to a power of two number of buckets
+        """
+        if buffer is None:
+            buckets = max(1, int(size_mb * (1 << 20)) // BUCKET_BYTES)
+        else:
+            buckets = max(1, len(memoryview(buffer).cast('B')) // BUCKET_BYTES)
+        # power of two, so that the bucket index is a mask of the key
+        buckets = 1 << (buckets.bit_length() - 1)
+        if buffer is None:
+            buffer = bytearray(buckets * BUCKET_BYTES)
+        self.buffer = buffer
+        self.words = memoryview(buffer).cast('B')[:buckets * BUCKET_BYTES].cast('Q')
+        self.buckets = buckets
+        self._mask = buckets - 1
+        self.generation = 0
+        self.probes = 0
+        self.hits = 0
+        self.stores = 0
+
+    @property
+    def memory(self) -> int:
+        """
+        Size of the table in bytes
+        """
+        return self.buckets * BUCKET_BYTES
+
+    @property
+    def hit_rate(self) -> float:
+        """
+        Fraction of the probes since the last reset_stats that found their position
+        """
+        return self.hits / self.probes if self.probes else 0.0
+
+    def usage(self, sample: int = 1000) -> float:
+        """
+        Function to estimate how full the table is from its first buckets
+
+        Args:
+            sample (int): number of buckets to look at
+
+        Returns:
+            float: Fraction of the entries in the sample written during the current search
+        """
+        words = self.words
+        sample = min(sample, self.buckets)
+        used = 0
+        for i in range(0, sample * WORDS_PER_BUCKET, 2):
+            data = words[i + 1]
+            if data and data >> 58 == self.generation:
+                used += 1
+        return used / (sample * 2)
+
+    def new_search(self):
+        """
+        Start a new search, entries of older searches are replaced first
+        """
+        self.generation = (self.generation + 1) & 63
+
+    def reset_stats(self):
+        self.probes = 0
+        self.hits = 0
+        self.stores = 0
+
+    def clear(self):
+        """
+        Empty the table and reset the statistics
+        """
+        memoryview(self.buffer).cast('B')[:self.memory] = bytes(self.memory)
+        self.generation = 0
+        self.reset_stats()
+
+    def close(self):
+        """
+        Release the view on the buffer, a SharedMemory can only be closed once no view on it is left
+        """
+        self.words.release()
+
+    def probe(self, key: int):
+        """
+        Function to look a position up
+
+        Args:
+            key (int): Zobrist hash of the position
+
+        Returns:
+            tuple | None: (move, score, depth, bound) if the position is stored, None otherwise.
+            move is packed (see board_utils.pack_move) and 0 if none was stored
+        """
+        self.probes += 1
+        words = self.words
+        index = (key & self._mask) * WORDS_PER_BUCKET
+        for i in (index, index + 2):
+            data = words[i + 1]
+            if words[i] ^ data == key and data:
+                self.hits += 1
+                return (data & 0xFFFF, (data >> 16 & 0xFFFFFFFF) - SCORE_OFFSET,
+                        data >> 48 & 0xFF, data >> 56 & 3)
+        return None
+
+    def store(self, key: int, move: int, score: int, depth: int, bound: int):
+        """
+        Function to store a search result. The depth-preferred entry of the bucket is replaced when the new
+        result is at least as deep, belongs to the same position or the stored one is from an older search,
+        the always-replace entry otherwise
+
+        Args:
+            key (int): Zobrist hash of the position
+            move (int): best move found, packed, 0 if none
+            score (int): score of the position
+            depth (int): depth the position was searched to
+            bound (int): EXACT, LOWER (the score is at least this) or UPPER (the score is at most this)
+        """
+        self.stores += 1
+        words = self.words
+        index = (key & self._mask) * WORDS_PER_BUCKET
+        stored = words[index + 1]
+        if (depth >= stored >> 48 & 0xFF or stored >> 58 != self.generation
+                or words[index] ^ stored == key):
+            i = index
+        else:
+            i = index + 2
+        data = (move | (score + SCORE_OFFSET) << 16 | min(depth, 255) << 48 | bound << 56
+                | self.generation << 58)
+        words[i] = key ^ data
+        words[i + 1] = data
@@ -0,0 +1,116 @@
+import queue
+import threading
+
+from .chess_logic import ChessLogic
+from .engine import Engine, CancellationToken
+from .transposition import TranspositionTable
+
+
+class GameState:
+    __slots__ = ("board", "result", "turn", "move", "notation")
+
+    def __init__(self, board: list[list[str]], result: str, turn: str, move: str = "", notation: str = ""):
+        """
+        Copy of the position posted by GameWorker, the front end draws from it and never reads the ChessLogic
+        object the worker is changing
+
+        Args:
+            board (list[list[str]]): copy of ChessLogic.board
+            result (str): ChessLogic.result
+            turn (str): side to move
+            move (str): the move that was processed, '' for the initial state
+            notation (str): play_move output for the move, '' if the move was rejected
+        """
+        self.board = board
+        self.result = result
+        self.turn = turn
+        self.move = move
+        self.notation = notation
+
+    @classmethod
+    def of(cls, logic: ChessLogic, move: str = "", notation: str = "") -> "GameState":
+        return cls([list(row) for row in logic.board], logic.result, logic.turn, move, notation)
+
+
+class GameWorker:
+    def __init__(self, logic: ChessLogic, engine_side: str | None = None, time_limit: float = 1.0,
+                 table_mb: float = 16):
+        """
+        Thread running the game logic and an optional engine opponent off the UI thread. The UI submits moves
+        with submit_move and picks up a GameState for every processed move with poll, so neither move
+        validation nor the engine search ever blocks a frame. Once started, the worker thread is the only
+        one touching logic
+
+        Args:
+            logic (ChessLogic): the game
+            engine_side (str | None): 'w' or 'b' for the side the engine plays, None for two human players
+            time_limit (float): seconds the engine searches per move
+            table_mb (float): transposition table size of the engine in megabytes
+        """
+        self.logic = logic
+        self.engine_side = engine_side
+        self.time_limit = time_limit
+        self.engine = Engine(logic, TranspositionTable(table_mb)) if engine_side is not None else None
+        self.requests: queue.Queue = queue.Queue()
+        self.results: queue.Queue = queue.Queue()
+        self._token = CancellationToken()
+        self._thread = threading.Thread(target=self._run, name="GameWorker", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self, timeout: float | None = None):
+        """
+        Cancel a running search and wait for the thread to finish
+        """
+        self._token.cancel()
+        self.requests.put(None)
+        self._thread.join(timeout)
+
+    def submit_move(self, move: str):
+        """
+        Queue a move of the human player, in the play_move format
+        """
+        self.requests.put(move)
+
+    def poll(self) -> list[GameState]:
+        """
+        Function to collect the states posted since the last call, without blocking
+
+        Returns:
+            list[GameState]: one state per processed move, oldest first
+        """
+        states = []
+        while True:
+            try:
+                states.append(self.results.get_nowait())
+            except queue.Empty:
+                return states
+
+    def _run(self):
+        logic = self.logic
+        if self._engine_to_move():
+            self._engine_move()
+        while True:
+            move = self.requests.get()
+            try:
+                if move is None or self._token.cancelled:
+                    return
+                if logic.result != '' or logic.turn == self.engine_side:
+                    self.results.put(GameState.of(logic, move))
+                    continue
+                self.results.put(GameState.of(logic, move, logic.play_move(move)))
+                if self._engine_to_move():
+                    self._engine_move()
+            finally:
+                self.requests.task_done()
+
+    def _engine_to_move(self) -> bool:
+        return self.engine is not None and self.logic.turn == self.engine_side and self.logic.result == ''
+
+    def _engine_move(self):
+        result = self.engine.search(time_limit=self.time_limit, stop=self._token)
+        if self._token.cancelled or result.move is None:
+            return
+        move = result.move_name
+        self.results.put(GameState.of(self.logic, move, self.logic.play_move(move)))
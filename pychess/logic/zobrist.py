@@ -0,0 +1,72 @@
+import random
+
+from .board_utils import parse_move
+
+# fixed seed so that keys, and therefore hashes, are the same in every process
+_random = random.Random(0x5EED)
+
+# one key per piece per square index (row * 8 + col)
+PIECE_KEYS = {piece: [_random.getrandbits(64) for _ in range(64)] for piece in "PNBRQKpnbrqk"}
+# xored in when black is to move
+SIDE_KEY = _random.getrandbits(64)
+# one key per combination of the Castling.rights flags
+CASTLING_KEYS = [_random.getrandbits(64) for _ in range(16)]
+# one key per file of a pawn that can be captured en passant
+EN_PASSANT_KEYS = [_random.getrandbits(64) for _ in range(8)]
+
+
+def en_passant_file(board, last_move):
+    """
+    Function to find the file on which an en passant capture is possible
+
+    Args:
+        board: 2D list representing the chess board
+        last_move: the last move played, packed (EnPassant.last) or as a string (EnPassant.last_move)
+
+    Returns:
+        int | None: column of the pawn that just moved two squares, if an opponent pawn stands next to it.
+        None otherwise
+    """
+    if last_move is None or last_move == '':
+        return None
+    if type(last_move) is str:
+        last_move = parse_move(last_move)
+    start, end = last_move & 63, last_move >> 6 & 63
+    # two rows apart on the same column
+    if abs(start - end) != 16:
+        return None
+    end_row, col = end >> 3, end & 7
+    pawn = board[end_row][col]
+    if pawn not in ('P', 'p'):
+        return None
+    opponent = 'p' if pawn == 'P' else 'P'
+    if (col > 0 and board[end_row][col - 1] == opponent) or (col < 7 and board[end_row][col + 1] == opponent):
+        return col
+    return None
+
+
+def compute_hash(board, turn, castling_rights, ep_file) -> int:
+    """
+    Function to compute the Zobrist hash of a position from scratch
+
+    Args:
+        board: 2D list representing the chess board
+        turn: side to move, 'w' or 'b'
+        castling_rights: Castling.rights bit flags
+        ep_file: file on which en passant is possible, see en_passant_file
+
+    Returns:
+        int: 64 bit hash of the position
+    """
+    key = 0
+    for row in range(8):
+        for col in range(8):
+            piece = board[row][col]
+            if piece != '':
+                key ^= PIECE_KEYS[piece][row * 8 + col]
+    if turn == 'b':
+        key ^= SIDE_KEY
+    key ^= CASTLING_KEYS[castling_rights]
+    if ep_file is not None:
+        key ^= EN_PASSANT_KEYS[ep_file]
+    return key
@@ -2,11 +2,17 @@ import pygame
 
 from display.classes.Board import Board
 from logic.chess_logic import ChessLogic
+from logic.worker import GameWorker
 
 """
 Configuration Variables
 """
 WINDOW_SIZE = (600, 600)
+FRAME_RATE = 60
+# side played by the engine ('w' or 'b'), None for two human players
+ENGINE_SIDE = None
+# seconds the engine thinks per move
+ENGINE_TIME = 1.0
 
 """
 Pygame Initialization
@@ -19,31 +25,41 @@ font = pygame.font.SysFont(None, 50)
 Chess Game Logic and Chess Board Initalization
 """
 logic = ChessLogic()
-board = Board(WINDOW_SIZE[0], WINDOW_SIZE[1], logic)
+# move validation, the game result and the engine run on the worker thread, the game loop only draws
+worker = GameWorker(logic, ENGINE_SIDE, ENGINE_TIME)
+board = Board(WINDOW_SIZE[0], WINDOW_SIZE[1], logic, worker)
+clock = pygame.time.Clock()
 
 def draw(display, font):
     """
-    Draw/Update the current game state to Pygame Window
+    Draw/Update the current game state to Pygame Window. Only the areas the board reports as
+    changed are sent to the screen, nothing at all while the position does not change
 
     Args:
         display: Pygame Screen Object
         font: Pygame Font Object
     """
-    display.fill("white")
-    board.draw(display, font)
-    pygame.display.update()
+    dirty = board.draw(display, font)
+    if dirty:
+        pygame.display.update(dirty)
 
 if __name__ == "__main__":
     """
     Game Loop
     """
+    worker.start()
     running = True
     while running:
         mx, my = pygame.mouse.get_pos()
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 running = False
+            elif event.type == pygame.VIDEOEXPOSE:
+                # the window contents were lost, i.e. it was uncovered
+                board.invalidate()
             elif event.type == pygame.MOUSEBUTTONDOWN:
                 if event.button == 1:
                     board.handle_click(mx, my)
-        draw(screen, font)
\ No newline at end of file
+        draw(screen, font)
+        clock.tick(FRAME_RATE)
+    worker.stop(timeout=1.0)
\ No newline at end of file
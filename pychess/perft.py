@@ -0,0 +1,117 @@
+import argparse
+import os
+import time
+
+from logic.chess_logic import ChessLogic
+from logic.parallel import parallel_perft, parallel_perft_divide, worker_counts
+
+"""
+Standard perft positions (https://www.chessprogramming.org/Perft_Results) with their
+known node counts, nodes[i] is the count at depth i + 1
+"""
+POSITIONS = {
+    "initial": {
+        "fen": "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1",
+        "nodes": [20, 400, 8902, 197281, 4865609, 119060324],
+    },
+    "kiwipete": {
+        "fen": "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+        "nodes": [48, 2039, 97862, 4085603, 193690690],
+    },
+    "position3": {
+        "fen": "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1",
+        "nodes": [14, 191, 2812, 43238, 674624, 11030083],
+    },
+    "position4": {
+        "fen": "r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1",
+        "nodes": [6, 264, 9467, 422333, 15833292],
+    },
+    "position5": {
+        "fen": "rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8",
+        "nodes": [44, 1486, 62379, 2103487, 89941194],
+    },
+    "position6": {
+        "fen": "r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10",
+        "nodes": [46, 2079, 89890, 3894594, 164075551],
+    },
+}
+
+
+def setup_position(name: str, backend: str = "list") -> ChessLogic:
+    """
+    Build a ChessLogic object for one of the perft positions
+
+    Args:
+        name (str): key of POSITIONS
+        backend (str): board backend, see ChessLogic
+
+    Returns:
+        ChessLogic: the position, ready to search
+    """
+    return ChessLogic.from_fen(POSITIONS[name]["fen"], backend)
+
+
+def run(name: str, depth: int, divide: bool = False, backend: str = "list", workers: int = 1) -> bool:
+    """
+    Run perft on one position and print the node count, the expected count and the speed
+
+    Args:
+        workers (int): number of processes, the root moves are split across them when more than 1
+
+    Returns:
+        bool: True if the node count matches the known value (or no value is known for the depth)
+    """
+    logic = setup_position(name, backend)
+    start = time.perf_counter()
+    if divide:
+        counts = logic.perft_divide(depth) if workers == 1 else parallel_perft_divide(logic, depth, workers)
+        nodes = sum(counts.values())
+    else:
+        nodes = logic.perft(depth) if workers == 1 else parallel_perft(logic, depth, workers)
+    elapsed = time.perf_counter() - start
+
+    if divide:
+        for move, count in sorted(counts.items()):
+            print(f"  {move}: {count}")
+    known = POSITIONS[name]["nodes"]
+    expected = known[depth - 1] if depth <= len(known) else None
+    ok = expected is None or nodes == expected
+    status = "?" if expected is None else "OK" if ok else f"FAIL (expected {expected})"
+    print(f"{name:<10} depth {depth}  {nodes:>10} nodes  {elapsed:8.2f}s  {nodes / max(elapsed, 1e-9):10.0f} nodes/s  {status}")
+    return ok
+
+
+def scaling(name: str, depth: int, max_workers: int, backend: str = "list"):
+    """
+    Time perft on one position with 1, 2, 4, ... up to max_workers processes and print the speedup over 1
+    """
+    logic = setup_position(name, backend)
+    base = None
+    for workers in worker_counts(max_workers):
+        start = time.perf_counter()
+        nodes = logic.perft(depth) if workers == 1 else parallel_perft(logic, depth, workers)
+        elapsed = time.perf_counter() - start
+        base = base or elapsed
+        print(f"{name:<10} depth {depth}  {workers:>3} workers  {nodes:>10} nodes  {elapsed:8.2f}s  "
+              f"{nodes / max(elapsed, 1e-9):10.0f} nodes/s  speedup {base / max(elapsed, 1e-9):5.2f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Count move generation leaf nodes on the standard perft positions")
+    parser.add_argument("--depth", type=int, default=3, help="search depth (default 3)")
+    parser.add_argument("--position", choices=sorted(POSITIONS), action="append",
+                        help="position to run, can be repeated (default all)")
+    parser.add_argument("--divide", action="store_true", help="print the node count below every root move")
+    parser.add_argument("--backend", choices=["list", "bitboard"], default="list", help="board backend (default list)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help=f"number of processes to split the root moves across (default 1, this machine has {os.cpu_count()})")
+    parser.add_argument("--scaling", action="store_true",
+                        help="time every position with 1, 2, 4, ... up to --workers processes and print the speedup")
+    args = parser.parse_args()
+
+    if args.scaling:
+        for name in args.position or POSITIONS:
+            scaling(name, args.depth, args.workers, args.backend)
+        raise SystemExit(0)
+    results = [run(name, args.depth, args.divide, args.backend, args.workers) for name in (args.position or POSITIONS)]
+    raise SystemExit(0 if all(results) else 1)
@@ -0,0 +1,46 @@
+import pytest
+from logic.attack_map import AttackMap
+from logic.board_utils import is_square_attacked
+from logic.chess_logic import ChessLogic
+from perft import setup_position
+
+def assert_counts_match(logic):
+    fresh = AttackMap(logic.board)
+    assert logic.attacks.counts == fresh.counts
+    for square in range(64):
+        assert fresh.attacked(square, True) == is_square_attacked(logic.board, (square // 8, square % 8), 'b')
+        assert fresh.attacked(square, False) == is_square_attacked(logic.board, (square // 8, square % 8), 'w')
+
+def test_initial_counts():
+    attacks = ChessLogic().attacks
+    # f3 is covered by the e2 and g2 pawns and the g1 knight
+    assert attacks.counts[0][5 * 8 + 5] == 3
+    assert attacks.counts[1][5 * 8 + 5] == 0
+    assert attacks.is_square_attacked("f6", 'w')
+    assert not attacks.is_square_attacked("e4", 'w')
+
+@pytest.mark.parametrize("name", ["kiwipete", "position4", "position5"])
+def test_counts_follow_moves(name):
+    logic = setup_position(name)
+    assert_counts_match(logic)
+    for move in logic.legal_moves():
+        logic.make_move(move)
+        assert_counts_match(logic)
+        for reply in logic.legal_moves():
+            logic.make_move(reply)
+            assert logic.attacks.counts == AttackMap(logic.board).counts
+            logic.unmake_move()
+        logic.unmake_move()
+    assert_counts_match(logic)
+
+def test_castling_through_check():
+    # the f8 rook covers f1, the king may not pass it
+    logic = ChessLogic.from_fen("4kr2/8/8/8/8/8/8/R3K2R w KQ - 0 1")
+    assert not logic.castling.applies(logic.board, "e1g1", logic.attacks)
+    assert logic.castling.applies(logic.board, "e1c1", logic.attacks)
+    logic.make_move("a1a2")
+    logic.make_move("f8b8")
+    # now b1 is attacked, which the king does not pass on the queen side
+    assert logic.castling.applies(logic.board, "e1g1", logic.attacks)
+    assert sorted(move for move in logic.legal_moves() if move.startswith("e1")) == \
+        ["e1d1", "e1d2", "e1e2", "e1f1", "e1f2", "e1g1"]
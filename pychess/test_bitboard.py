@@ -0,0 +1,112 @@
+import pytest
+from logic.bitboard import Bitboard, rook_attacks, bishop_attacks, KNIGHT_ATTACKS
+from logic.board_utils import is_square_attacked, get_piece, move_piece
+from logic.chess_logic import ChessLogic
+from logic.tables import ROOK_DIRECTIONS, BISHOP_DIRECTIONS
+
+def get_initial_board():
+    return [
+        ['r', 'n', 'b', 'q', 'k', 'b', 'n', 'r'],
+        ['p', 'p', 'p', 'p', 'p', 'p', 'p', 'p'],
+        ['','','','','','','',''],
+        ['','','','','','','',''],
+        ['','','','','','','',''],
+        ['','','','','','','',''],
+        ['P', 'P', 'P', 'P', 'P', 'P', 'P', 'P'],
+        ['R', 'N', 'B', 'Q', 'K', 'B', 'N', 'R'],
+    ]
+
+def test_board_view():
+    board = Bitboard(get_initial_board())
+    assert board == get_initial_board()
+    assert board.to_rows() == get_initial_board()
+    assert board[7][4] == 'K'
+    assert board[4][4] == ''
+    assert get_piece(board, 'd8') == 'q'
+
+    move_piece(board, 'e2', 'e4')
+    assert board[6][4] == '' and board[4][4] == 'P'
+    board[0][0] = 'Q'
+    assert board[0][0] == 'Q'
+    # white queens on d1 and a8, the a8 black rook is gone
+    assert board.pieces[4] == (1 << 59) | 1
+    assert board.pieces[9] == 1 << 7
+
+def test_attack_tables():
+    # knight on d4 (row 4, col 3)
+    assert bin(KNIGHT_ATTACKS[4 * 8 + 3]).count("1") == 8
+    # knight in the corner
+    assert bin(KNIGHT_ATTACKS[0]).count("1") == 2
+    # rook on a1 with a blocker on a4
+    assert rook_attacks(56, 1 << 32) == (1 << 48) | (1 << 40) | (1 << 32) | sum(1 << sq for sq in range(57, 64))
+    # bishop on a8 on an empty board sees the whole long diagonal
+    assert bishop_attacks(0, 0) == sum(1 << (9 * i) for i in range(1, 8))
+
+def ray_walk(square, occupied, directions):
+    attacks = 0
+    for dr, dc in directions:
+        row, col = divmod(square, 8)
+        row, col = row + dr, col + dc
+        while 0 <= row < 8 and 0 <= col < 8:
+            attacks |= 1 << (row * 8 + col)
+            if occupied >> (row * 8 + col) & 1:
+                break
+            row, col = row + dr, col + dc
+    return attacks
+
+def test_line_lookups_match_ray_walk():
+    import random
+    rng = random.Random(7)
+    for _ in range(500):
+        occupied = rng.getrandbits(64) & rng.getrandbits(64)
+        square = rng.randrange(64)
+        assert rook_attacks(square, occupied) == ray_walk(square, occupied, ROOK_DIRECTIONS)
+        assert bishop_attacks(square, occupied) == ray_walk(square, occupied, BISHOP_DIRECTIONS)
+
+@pytest.mark.parametrize("fen", [
+    # pinned pawns: the e pawn may only push, the d pawn may only capture the pinning bishop
+    "4k3/8/8/4r3/8/2b5/3PP3/4K3 w - - 0 1",
+    # a pawn pinned along its rank cannot move
+    "8/8/8/r2P1K2/8/8/8/4k3 w - - 0 1",
+    # pushes, double pushes, captures and promotions of both sides
+    "r3k3/1P4p1/8/3pP3/8/8/1p4P1/4K2R b - - 0 1",
+    "r3k3/1P4p1/8/3pP3/8/8/1p4P1/4K2R w - d6 0 1",
+])
+def test_pawn_moves_match_list_board(fen):
+    assert sorted(ChessLogic.from_fen(fen, "bitboard").legal_moves()) == sorted(ChessLogic.from_fen(fen).legal_moves())
+
+@pytest.mark.parametrize("pieces, square, color", [
+    ({'e4': 'K', 'c4': 'r'}, 'e4', 'w'),
+    ({'e4': 'K', 'c6': 'q'}, 'e4', 'w'),
+    ({'e4': 'K', 'd5': 'p'}, 'e4', 'w'),
+    ({'e4': 'k', 'f3': 'P'}, 'e4', 'b'),
+    ({'e4': 'K', 'c5': 'n'}, 'e4', 'w'),
+    ({'e4': 'K', 'b4': 'r', 'c4': 'p'}, 'e4', 'w'),
+    ({'e4': 'K', 'd3': 'p'}, 'e4', 'w'),
+    ({'e4': 'k', 'd5': 'P'}, 'e4', 'b'),
+])
+def test_is_square_attacked_matches_list_board(pieces, square, color):
+    rows = [[''] * 8 for _ in range(8)]
+    for name, piece in pieces.items():
+        rows[8 - int(name[1])][ord(name[0]) - ord('a')] = piece
+    assert is_square_attacked(Bitboard(rows), square, color) == is_square_attacked(rows, square, color)
+
+def test_bitboard_backend_legal_moves():
+    logic = ChessLogic(backend="bitboard")
+    assert isinstance(logic.board, Bitboard)
+    assert len(logic.legal_moves()) == 20
+
+    total = 0
+    for move in logic.legal_moves():
+        logic.make_move(move)
+        total += len(logic.legal_moves())
+        logic.unmake_move()
+    assert total == 400
+    assert logic.board == get_initial_board()
+
+    assert logic.play_move("e2e4") == "e2e4"
+    assert logic.board[4][4] == 'P'
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        ChessLogic(backend="array")
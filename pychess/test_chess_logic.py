@@ -1,6 +1,6 @@
 import pytest
 from logic.chess_logic import ChessLogic
-from logic.board_utils import is_square_attacked
+from logic.board_utils import is_square_attacked, get_piece, index2str, move_name
 
 @pytest.fixture
 def new_game():
@@ -275,6 +275,16 @@ def test_pawn_promotion_black():
     assert logic.board[7][4] == "q"  
     assert logic.board[6][4] == "" 
 
+@pytest.mark.parametrize("fen, move, expected", [
+    ("4k3/P7/8/8/8/8/8/4K3 w - - 0 1", "a7a8", "a7a8=Q"),
+    ("4k3/P7/8/8/8/8/8/4K3 w - - 0 1", "a7a8n", "a7a8=N"),
+    ("1r2k3/P7/8/8/8/8/8/4K3 w - - 0 1", "a7b8r", "a7xb8=R"),
+    ("4k3/8/8/8/8/8/7p/K7 b - - 0 1", "h2h1", "h2h1=Q"),
+])
+def test_promotion_notation(fen, move, expected):
+    logic = ChessLogic.from_fen(fen)
+    assert logic.play_move(move) == expected
+
 # ========================== En Passant Tests ========================== #
 def test_en_passant():
     """Test en passant capture"""
@@ -500,4 +510,485 @@ def test_invalid_move():
     ]
     logic.black_king_index = (4, 3)
     assert logic.invalid_move(logic.board, 'd6d5', 'b') == False
-    assert logic.invalid_move(logic.board, 'd6d7', 'b') == False
\ No newline at end of file
+    assert logic.invalid_move(logic.board, 'd6d7', 'b') == False
+
+# ========================== Make / Unmake Tests ========================== #
+@pytest.mark.parametrize("moves", [
+    ["e2e4"],
+    ["e2e4", "d7d5", "e4d5"],                         # capture
+    ["e2e4", "a7a6", "e4e5", "d7d5", "e5d6"],         # en passant
+    ["g1f3", "g8f6", "e2e3", "e7e6", "f1e2", "f8e7", "e1g1", "e8g8"],  # castling
+])
+def test_make_unmake_restores_position(moves):
+    import copy
+    logic = ChessLogic()
+    snapshots = []
+    for move in moves:
+        snapshots.append((copy.deepcopy(logic.board), logic.turn, logic.en_passant.last_move,
+                          logic.castling.white_castling_allowed, logic.castling.back_castling_allowed,
+                          logic.white_king_index, logic.black_king_index))
+        logic.make_move(move)
+    for snapshot in reversed(snapshots):
+        logic.unmake_move()
+        assert (logic.board, logic.turn, logic.en_passant.last_move,
+                logic.castling.white_castling_allowed, logic.castling.back_castling_allowed,
+                logic.white_king_index, logic.black_king_index) == snapshot
+
+def test_unmake_without_move():
+    logic = ChessLogic()
+    with pytest.raises(IndexError):
+        logic.unmake_move()
+    logic.make_move("e2e4")
+    logic.unmake_move()
+    with pytest.raises(IndexError):
+        logic.unmake_move()
+    # the failed call leaves the position untouched
+    assert logic.to_fen() == ChessLogic().to_fen()
+    assert logic.hash_history == [logic.hash]
+    logic.make_move("e2e4")
+    assert logic.board[4][4] == 'P'
+
+def test_make_move_special_moves():
+    logic = ChessLogic()
+    for move in ["e2e4", "a7a6", "e4e5", "d7d5", "e5d6"]:
+        logic.make_move(move)
+    assert get_piece(logic.board, "d5") == ""
+    assert get_piece(logic.board, "d6") == "P"
+
+    logic = ChessLogic()
+    logic.board[7][5] = logic.board[7][6] = ''
+    logic.sync_state()
+    logic.make_move("e1g1")
+    assert logic.board[7][4:8] == ['', 'R', 'K', '']
+    assert logic.white_king_index == (7, 6)
+    assert logic.castling.white_castling_allowed is False
+
+    logic = ChessLogic()
+    logic.board[1][4] = 'P'
+    logic.board[0][4] = ''
+    logic.sync_state()
+    logic.make_move("e7e8n")
+    assert logic.board[0][4] == 'N'
+    logic.unmake_move()
+    assert logic.board[1][4] == 'P' and logic.board[0][4] == ''
+
+
+# ========================== Legal Move Generation Tests ========================== #
+def test_legal_moves_initial_position():
+    logic = ChessLogic()
+    assert len(logic.legal_moves()) == 20
+    assert sorted(logic.legal_moves_from("g1")) == ["g1f3", "g1h3"]
+    assert logic.legal_moves_from("e7") == []
+
+    # every reply to every first move
+    total = 0
+    for move in logic.legal_moves():
+        logic.make_move(move)
+        total += len(logic.legal_moves())
+        logic.unmake_move()
+    assert total == 400
+
+def test_legal_moves_pins_and_checks():
+    logic = ChessLogic()
+    logic.board = [
+        ['', '', '', '', 'k', '', '', ''],
+        ['', '', '', '', 'r', '', '', ''],
+        ['', '', '', '', '', '', '', ''],
+        ['', '', '', '', '', '', '', ''],
+        ['', 'b', '', '', '', '', '', ''],
+        ['', '', '', '', 'R', '', '', ''],
+        ['', '', '', 'N', '', '', '', ''],
+        ['', '', '', '', 'K', '', 'N', ''],
+    ]
+    logic.black_king_index = (0, 4)
+    # the rook is pinned on the e file, the knight is pinned by the bishop
+    assert sorted(logic.legal_moves_from("e3")) == ["e3e2", "e3e4", "e3e5", "e3e6", "e3e7"]
+    assert logic.legal_moves_from("d2") == []
+
+    logic.board[5][4] = ''
+    logic.sync_state()
+    # in check from the rook, only blocking with the free knight or stepping aside
+    assert sorted(logic.legal_moves()) == ["e1d1", "e1f1", "e1f2", "g1e2"]
+
+def test_legal_moves_special_moves():
+    logic = ChessLogic()
+    logic.board = [
+        ['r', '', '', '', 'k', '', '', 'r'],
+        ['', '', '', '', '', 'P', '', ''],
+        ['', '', '', '', '', '', '', ''],
+        ['', '', '', 'p', 'P', '', '', ''],
+        ['', '', '', '', '', '', '', ''],
+        ['', '', '', '', '', 'b', '', ''],
+        ['', '', '', '', '', '', '', ''],
+        ['R', '', '', '', 'K', '', '', 'R'],
+    ]
+    logic.en_passant.last_move = "d7d5"
+    moves = logic.legal_moves()
+    # castling queen side would pass through the bishop's attack on d1
+    assert "e1g1" in moves and "e1c1" not in moves
+    assert "e5d6" in moves
+    assert {"f7f8q", "f7f8r", "f7f8b", "f7f8n"} <= set(moves)
+
+    assert logic.play_move("e5d6") == "e5xd6"
+    assert logic.board[3][3] == ""
+
+
+# ========================== Zobrist Hash Tests ========================== #
+def test_hash_transpositions():
+    logic = ChessLogic()
+    start = logic.hash
+    for move in ["g1f3", "g8f6", "f3g1", "f6g8"]:
+        logic.play_move(move)
+    assert logic.hash == start
+
+    # same pieces, different side to move
+    logic.make_move("e2e3")
+    logic.make_move("e7e6")
+    logic.make_move("e3e4")
+    other = ChessLogic()
+    other.make_move("e2e4")
+    other.make_move("e7e6")
+    assert logic.board == other.board and logic.hash != other.hash
+
+    # a double pawn push only matters when it can be captured en passant
+    logic = ChessLogic()
+    for move in ["e2e4", "e7e6", "e4e5", "d7d5"]:
+        logic.make_move(move)
+    without_en_passant = logic.hash
+    logic.en_passant.last_move = None
+    logic.sync_state()
+    assert logic.hash != without_en_passant
+
+    logic = ChessLogic()
+    logic.make_move("e2e4")
+    with_double_push = logic.hash
+    logic.en_passant.last_move = None
+    logic.sync_state()
+    assert logic.hash == with_double_push
+
+@pytest.mark.parametrize("moves", [
+    ["e2e4", "d7d5", "e4d5", "g8f6", "f1b5", "c7c6", "d5c6", "d8d2", "b1d2", "e7e5", "c6b7", "e8e7", "b7a8q"],
+    ["e2e4", "a7a6", "e4e5", "d7d5", "e5d6", "e7e6", "g1f3", "f8e7", "f1e2", "g8f6", "e1g1", "e8g8"],
+])
+def test_hash_incremental_matches_full(moves):
+    from logic.zobrist import compute_hash, en_passant_file
+    logic = ChessLogic()
+    hashes = []
+    for move in moves:
+        hashes.append(logic.hash)
+        logic.make_move(move)
+        assert logic.hash == compute_hash(logic.board, logic.turn, logic.castling.rights,
+                                          en_passant_file(logic.board, logic.en_passant.last_move))
+    for expected in reversed(hashes):
+        logic.unmake_move()
+        assert logic.hash == expected
+
+
+# ========================== Draw Detection Tests ========================== #
+def test_threefold_repetition():
+    logic = ChessLogic()
+    shuffle = ["g1f3", "g8f6", "f3g1", "f6g8"]
+    for move in shuffle:
+        logic.play_move(move)
+    assert logic.result == ""
+    assert not logic.is_threefold_repetition()
+    for move in shuffle[:3]:
+        logic.play_move(move)
+    assert logic.result == ""
+    logic.play_move(shuffle[3])
+    # the initial position is on the board for the third time
+    assert logic.is_threefold_repetition()
+    assert logic.result == "d"
+
+    logic.unmake_move()
+    assert not logic.is_threefold_repetition()
+    assert len(logic.hash_history) == 8
+
+def test_fifty_move_rule():
+    logic = ChessLogic()
+    logic.play_move("g1f3")
+    assert logic.halfmove_clock == 1
+    logic.play_move("e7e5")
+    assert logic.halfmove_clock == 0
+
+    logic.halfmove_clock = 98
+    logic.play_move("f3g1")
+    assert logic.result == ""
+    logic.play_move("b8c6")
+    assert logic.is_fifty_move_rule()
+    assert logic.result == "d"
+
+def test_insufficient_material():
+    logic = ChessLogic()
+    logic.board = [
+        ['', '', '', '', 'k', '', '', ''],
+        ['', '', '', '', '', '', '', ''],
+        ['', '', '', '', '', '', '', ''],
+        ['', '', '', 'r', '', '', '', ''],
+        ['', '', '', '', '', '', '', ''],
+        ['', '', '', '', '', 'N', '', ''],
+        ['', '', '', '', '', '', '', ''],
+        ['', '', '', '', 'K', '', '', ''],
+    ]
+    assert logic.piece_counts['r'] == 1
+    assert not logic.is_insufficient_material()
+    assert logic.play_move("f3e5") == "nf3e5"
+    assert logic.play_move("d5d1") == "rd5d1"
+    # only knight against bare king after the capture
+    assert logic.play_move("e1d1") == "ke1xd1"
+    assert logic.piece_counts['r'] == 0
+    assert logic.is_insufficient_material()
+    assert logic.result == "d"
+
+
+# ========================== Perft Tests ========================== #
+def test_perft_initial_position():
+    logic = ChessLogic()
+    assert logic.perft(0) == 1
+    assert logic.perft(3) == 8902
+    divide = logic.perft_divide(2)
+    assert len(divide) == 20
+    assert divide["e2e4"] == 20
+    assert sum(divide.values()) == 400
+
+@pytest.mark.parametrize("name", ["kiwipete", "position3", "position4", "position5", "position6"])
+def test_perft_positions(name):
+    from perft import POSITIONS, setup_position
+    logic = setup_position(name)
+    assert logic.perft(2) == POSITIONS[name]["nodes"][1]
+    assert logic.perft(2) == setup_position(name, "bitboard").perft(2)
+
+def test_snapshot_round_trip():
+    from perft import setup_position
+    logic = setup_position("kiwipete")
+    logic.make_move("e5d7")
+    logic.make_move("e8d7")
+    copy = ChessLogic.from_snapshot(logic.snapshot())
+    assert copy.board == logic.board
+    assert copy.turn == logic.turn
+    assert copy.castling.rights == logic.castling.rights
+    assert copy.hash == logic.hash
+    assert copy.halfmove_clock == logic.halfmove_clock
+    assert copy.legal_moves() == logic.legal_moves()
+    assert ChessLogic.from_snapshot(logic.snapshot(), "bitboard").hash == logic.hash
+
+def test_snapshot_keeps_history():
+    logic = ChessLogic()
+    logic.apply_moves(["g1f3", "g8f6", "f3g1", "f6g8", "g1f3", "g8f6", "f3g1"])
+    copy = ChessLogic.from_snapshot(logic.snapshot())
+    assert copy.fullmove_number == logic.fullmove_number
+    assert copy.hash_history == logic.hash_history
+    assert copy._repetitions == {key: count for key, count in logic._repetitions.items() if count}
+    # the third occurrence of the initial position is seen by the copy as well
+    copy.make_move("f6g8")
+    assert copy.is_threefold_repetition()
+    # positions before the last pawn move cannot repeat and are left out
+    logic.make_move("e7e5")
+    assert ChessLogic.from_snapshot(logic.snapshot()).hash_history == [logic.hash]
+
+def test_backend_name():
+    assert ChessLogic().backend == "list"
+    assert ChessLogic("bitboard").backend == "bitboard"
+    from logic.parallel import worker_counts
+    assert worker_counts(1) == [1]
+    assert worker_counts(6) == [1, 2, 4, 6]
+
+def test_parallel_perft():
+    from perft import setup_position
+    from logic.parallel import parallel_perft, parallel_perft_divide
+    logic = setup_position("kiwipete")
+    assert parallel_perft_divide(logic, 2, workers=2) == logic.perft_divide(2)
+    assert parallel_perft(logic, 2, workers=1) == 2039
+
+def test_fen_initial_position():
+    start = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+    assert ChessLogic().to_fen() == start
+    logic = ChessLogic.from_fen(start)
+    assert logic.board == ChessLogic().board
+    assert logic.hash == ChessLogic().hash
+
+    logic.make_move("e2e4")
+    assert logic.to_fen() == "rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq e3 0 1"
+    logic.make_move("g8f6")
+    assert logic.to_fen() == "rnbqkb1r/pppppppp/5n2/8/4P3/8/PPPP1PPP/RNBQKBNR w KQkq - 1 2"
+    logic.unmake_move()
+    logic.unmake_move()
+    assert logic.to_fen() == start
+
+def test_fen_round_trip():
+    fen = "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w Kq - 3 17"
+    logic = ChessLogic.from_fen(fen)
+    assert logic.to_fen() == fen
+    assert logic.white_king_index == (7, 4)
+    assert logic.black_king_index == (0, 4)
+    assert "e1g1" in logic.legal_moves()
+    assert "e1c1" not in logic.legal_moves()
+    assert ChessLogic.from_fen(fen, "bitboard").to_fen() == fen
+    # halfmove clock and fullmove number may be left out
+    assert ChessLogic.from_fen("4k3/8/8/8/8/8/8/4K3 b - -").to_fen() == "4k3/8/8/8/8/8/8/4K3 b - - 0 1"
+
+def test_fen_en_passant():
+    logic = ChessLogic.from_fen("4k3/8/8/3pP3/8/8/8/4K3 w - d6 0 1")
+    assert "e5d6" in logic.legal_moves()
+    logic.make_move("e5d6")
+    assert logic.board[3][3] == ''
+    played = ChessLogic()
+    for move in ["e2e4", "a7a6", "e4e5", "d7d5"]:
+        played.make_move(move)
+    assert ChessLogic.from_fen(played.to_fen()).hash == played.hash
+
+@pytest.mark.parametrize("fen", [
+    "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP w KQkq - 0 1",
+    "rnbqkbnr/pppppppp/9/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1",
+    "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR x KQkq - 0 1",
+    "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KX - 0 1",
+    "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq e4 0 1",
+    "8/8/8/8/8/8/8/4K3 w - - 0 1",
+])
+def test_fen_invalid(fen):
+    with pytest.raises(ValueError):
+        ChessLogic.from_fen(fen)
+
+def test_play_move_is_silent(capsys):
+    logic = ChessLogic()
+    for move in ["e2e4", "e7e5", "d1h5", "b8c6", "f1c4", "g8f6", "h5f7"]:
+        assert logic.play_move(move) != ""
+    assert logic.result == 'w'
+    assert capsys.readouterr().out == ""
+
+def test_trace_events():
+    events = []
+    logic = ChessLogic()
+    logic.trace = lambda event, data: events.append((event, data))
+    logic.play_move("e2e4")
+    assert logic.result == ''
+    assert ("invalid_move", {"move": "e2e4", "side": 'w', "piece": 'P', "causes_check": False,
+                             "invalid_for_piece": False}) in events
+    assert ("king_checked", {"side": 'b', "square": "e8", "checked": False}) in events
+    assert logic.play_move("e7e7") == ""
+    assert events[-1][1]["reason"] == "own piece on destination"
+
+def test_result_is_lazy():
+    calls = []
+    logic = ChessLogic()
+    game_over = logic._game_over
+    logic._game_over = lambda: calls.append(1) or game_over()
+    for move in ["e2e4", "e7e5", "d1h5", "b8c6", "f1c4", "g8f6"]:
+        logic.play_move(move)
+    assert calls == []
+    assert logic.result == ''
+    assert logic.result == ''
+    assert len(calls) == 1
+    logic.play_move("h5f7")
+    assert logic.result == 'w'
+    logic.unmake_move()
+    assert logic.result == ''
+
+def test_apply_moves():
+    moves = ["f2f3", "e7e5", "g2g4", "d8h4"]
+    logic = ChessLogic()
+    assert logic.apply_moves(moves) == 'b'
+    assert logic.to_fen() == "rnb1kbnr/pppp1ppp/8/4p3/6Pq/5P2/PPPPP2P/RNBQKBNR w KQkq - 1 3"
+
+    logic = ChessLogic()
+    assert logic.apply_moves(moves, verify=True) == 'b'
+    with pytest.raises(ValueError):
+        logic.apply_moves(["a2a3"], verify=True)
+    with pytest.raises(ValueError):
+        ChessLogic().apply_moves(["e2e5"], verify=True)
+
+@pytest.mark.parametrize("name", ["kiwipete", "position3", "position4", "position5", "position6"])
+def test_staged_legal_moves(name):
+    from perft import setup_position
+    for backend in ("list", "bitboard"):
+        logic = setup_position(name, backend)
+        staged = list(logic._staged_legal_moves(logic.turn))
+        assert sorted(staged) == sorted(logic._generate_legal_moves())
+        # captures come before quiet moves, apart from the king and en passant stages
+        captures = [logic.board[(move >> 6 & 63) // 8][(move >> 6) % 8] != '' for move in staged
+                    if logic.board[(move & 63) // 8][move % 8].lower() != 'k']
+        assert captures == sorted(captures, reverse=True)
+
+def test_staged_legal_moves_stop_early():
+    logic = ChessLogic.from_fen("4k3/8/8/8/8/8/4r3/R3K3 w Q - 0 1")
+    fen = logic.to_fen()
+    # in check, the king moves come first and stopping early leaves the board untouched
+    assert next(logic._staged_legal_moves('w')) & 63 == 60
+    assert logic.to_fen() == fen
+    assert not logic._no_valid_moves('w')
+    assert ChessLogic.from_fen("7k/5Q2/6K1/8/8/8/8/8 b - - 0 1")._no_valid_moves('b')
+    mate = ChessLogic.from_fen("rnb1kbnr/pppp1ppp/8/4p3/6Pq/5P2/PPPPP2P/RNBQKBNR w KQkq - 1 3")
+    assert mate._no_valid_moves('w')
+    assert mate.result == 'b'
+
+def test_piece_squares_follow_moves():
+    from perft import setup_position
+
+    def scan(logic):
+        squares = {piece: set() for piece in "PNBRQKpnbrqk"}
+        for square in range(64):
+            piece = logic.board[square // 8][square % 8]
+            if piece != '':
+                squares[piece].add(square)
+        return squares
+
+    # castling, promotions with capture and en passant all appear two plies deep in these positions
+    for name in ("kiwipete", "position4", "position5"):
+        logic = setup_position(name)
+        for move in logic.legal_moves():
+            logic.make_move(move)
+            for reply in logic.legal_moves():
+                logic.make_move(reply)
+                assert logic.piece_squares == scan(logic)
+                logic.unmake_move()
+            assert logic.piece_squares == scan(logic)
+            logic.unmake_move()
+        assert logic.piece_squares == scan(logic)
+    assert ChessLogic().piece_counts['P'] == 8
+
+@pytest.mark.parametrize("name", ["kiwipete", "position3", "position4", "position5"])
+def test_move_causes_check_mask_test(name):
+    from perft import setup_position
+    logic = setup_position(name)
+    side = logic.turn
+    king = logic.white_king_index if side == 'w' else logic.black_king_index
+    for row in range(8):
+        for col in range(8):
+            piece = logic.board[row][col]
+            if piece == '' or piece.isupper() != (side == 'w') or piece.lower() == 'k':
+                continue
+            for end in range(64):
+                move = index2str((row, col)) + index2str(divmod(end, 8))
+                target = logic.board[end // 8][end % 8]
+                if target.lower() == 'k' or (target != '' and target.isupper() == (side == 'w')):
+                    continue
+                # trial move on the board as the reference
+                logic.make_move(move)
+                expected = is_square_attacked(logic.board, king, side)
+                logic.unmake_move()
+                assert logic.move_causes_check(move, side) == expected, move
+
+def test_history_and_move_buffers():
+    from array import array
+    from logic.board_utils import Move
+    logic = ChessLogic()
+    logic.apply_moves(["e2e4", "d7d5", "e4d5", "g8f6", "f1b5", "c7c6", "d5c6", "d8d2", "b1d2", "f6e4",
+                       "c6b7", "e4d2", "b7a8n"])
+    history = logic.history()
+    assert isinstance(history, array) and history.typecode == 'H'
+    assert Move(history[0]) == "e2e4"
+    assert repr(Move(history[-1])) == "Move('b7a8n')"
+    assert Move("e7e8q").promotion == 'q' and Move("e7e8q").start == "e7"
+
+    replay = ChessLogic()
+    replay.apply_moves(history)
+    assert replay.to_fen() == logic.to_fen()
+    verified = ChessLogic()
+    verified.apply_moves(history[:6], verify=True)
+    assert verified.board == ChessLogic.from_fen(
+        "rnbqkb1r/pp2pppp/2p2n2/1B1P4/8/8/PPPP1PPP/RNBQK1NR w KQkq - 0 4").board
+
+    # generation reuses the buffer of the current ply
+    buffer = logic._move_buffer()
+    moves = logic._generate_legal_moves(moves=buffer)
+    assert moves is buffer and sorted(map(move_name, moves)) == sorted(logic.legal_moves())
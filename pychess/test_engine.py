@@ -0,0 +1,83 @@
+import threading
+import time
+
+import pytest
+from logic.chess_logic import ChessLogic
+from logic.engine import Engine, CancellationToken, best_move, MATE_SCORE, MAX_DEPTH
+from logic.parallel import lazy_smp_search
+
+@pytest.mark.parametrize("backend", ["list", "bitboard"])
+def test_mate_in_one(backend):
+    logic = ChessLogic.from_fen("6k1/5ppp/8/8/8/8/5PPP/R5K1 w - - 0 1", backend)
+    result = Engine(logic).search(depth=3)
+    assert result.move_name == "a1a8"
+    assert result.score == MATE_SCORE - 1
+    # the search leaves the position as it found it
+    assert logic.to_fen() == "6k1/5ppp/8/8/8/8/5PPP/R5K1 w - - 0 1"
+
+def test_wins_hanging_piece():
+    assert best_move("4k3/8/8/3q4/8/8/8/3RK3 w - - 0 1", depth=2) == "d1d5"
+    # the bishop is defended, taking it loses the queen
+    assert best_move("4k3/8/2p5/3b4/8/8/8/3QK3 w - - 0 1", depth=2) != "d1d5"
+
+def test_checkmated_and_stalemate():
+    assert best_move("7k/6Q1/6K1/8/8/8/8/8 b - - 0 1") is None
+    result = Engine(ChessLogic.from_fen("7k/5Q2/6K1/8/8/8/8/8 b - - 0 1")).search()
+    assert result.move is None and result.score == 0
+
+def test_time_limit():
+    logic = ChessLogic()
+    start = time.perf_counter()
+    result = Engine(logic).search(time_limit=0.5)
+    assert time.perf_counter() - start < 1.5
+    assert result.move_name in logic.legal_moves()
+    assert result.nodes > 0 and result.nps > 0
+    assert logic.to_fen() == ChessLogic().to_fen()
+
+def test_lazy_smp_search():
+    logic = ChessLogic.from_fen("6k1/5ppp/8/8/8/8/5PPP/R5K1 w - - 0 1")
+    result = lazy_smp_search(logic, depth=3, workers=2, table_mb=1)
+    assert result.move_name == "a1a8"
+    assert result.depth >= 1 and result.nodes > 0
+    assert logic.to_fen() == "6k1/5ppp/8/8/8/8/5PPP/R5K1 w - - 0 1"
+
+def test_stop_event():
+    stop = threading.Event()
+    stop.set()
+    logic = ChessLogic()
+    # the search stops at its first poll of the event and returns the last completed iteration
+    result = Engine(logic).search(depth=6, stop=stop)
+    assert result.depth < 6
+    assert result.move_name in logic.legal_moves()
+
+def test_node_limit():
+    logic = ChessLogic.from_fen("r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1")
+    result = Engine(logic).search(node_limit=3000)
+    assert result.nodes == 3000
+    assert result.move_name in logic.legal_moves()
+
+def test_interrupted_iteration_keeps_best_move():
+    # stopped inside the first iteration, after the queen capture (ordered first) was searched
+    result = Engine(ChessLogic.from_fen("4k3/8/8/3q4/8/8/8/3RK3 w - - 0 1")).search(node_limit=5)
+    assert result.depth == 0
+    assert result.move_name == "d1d5"
+
+def test_soft_limit():
+    # no new iteration is started once the soft limit has passed
+    result = Engine(ChessLogic()).search(depth=20, soft_limit=0)
+    assert result.depth == 1
+
+def test_deadline():
+    start = time.perf_counter()
+    result = Engine(ChessLogic()).search(deadline=start + 0.3)
+    assert time.perf_counter() - start < 1.0
+    assert result.depth >= 1
+
+def test_cancellation_token():
+    token = CancellationToken()
+    threading.Timer(0.3, token.cancel).start()
+    start = time.perf_counter()
+    result = Engine(ChessLogic()).search(depth=MAX_DEPTH, stop=token)
+    assert token.cancelled
+    assert time.perf_counter() - start < 1.5
+    assert result.move is not None
@@ -0,0 +1,52 @@
+import pytest
+from logic.chess_logic import ChessLogic
+from logic.evaluation import score_board, tapered, MAX_PHASE, MG_TABLES, EG_TABLES
+
+def assert_terms_match(logic):
+    assert (logic.mg_score, logic.eg_score, logic.phase) == score_board(logic.board)
+
+def test_initial_position():
+    logic = ChessLogic()
+    assert logic.phase == MAX_PHASE
+    assert logic.evaluate() == 0
+
+def test_mirrored_tables():
+    # a black piece scores the negative of the white one on the mirrored square
+    for piece in "PNBRQK":
+        for square in range(64):
+            assert MG_TABLES[piece.lower()][square ^ 56] == -MG_TABLES[piece][square]
+            assert EG_TABLES[piece.lower()][square ^ 56] == -EG_TABLES[piece][square]
+
+def test_tapered():
+    assert tapered(100, 300, MAX_PHASE) == 100
+    assert tapered(100, 300, 0) == 300
+    assert tapered(100, 300, MAX_PHASE // 2) == 200
+
+@pytest.mark.parametrize("backend", ["list", "bitboard"])
+@pytest.mark.parametrize("fen, moves", [
+    # castling both ways
+    ("r3k2r/8/8/8/8/8/8/R3K2R w KQkq - 0 1", ["e1g1", "e8c8"]),
+    # en passant
+    ("4k3/8/8/3pP3/8/8/8/4K3 w - d6 0 1", ["e5d6"]),
+    # promotion with and without capture
+    ("1r2k3/P7/8/8/8/8/7p/4K3 w - - 0 1", ["a7b8n", "h2h1q"]),
+])
+def test_incremental_terms(backend, fen, moves):
+    logic = ChessLogic.from_fen(fen, backend)
+    before = (logic.mg_score, logic.eg_score, logic.phase)
+    for move in moves:
+        logic.make_move(move)
+        assert_terms_match(logic)
+    for _ in moves:
+        logic.unmake_move()
+    assert (logic.mg_score, logic.eg_score, logic.phase) == before
+
+def test_material_advantage():
+    # white is a queen up
+    logic = ChessLogic.from_fen("4k3/8/8/8/8/8/8/3QK3 w - - 0 1")
+    assert logic.evaluate() > 800
+    logic.make_move("d1d8")
+    logic.make_move("e8d8")
+    assert_terms_match(logic)
+    assert logic.phase == 0
+    assert abs(logic.evaluate()) < 100
@@ -0,0 +1,56 @@
+from logic.chess_logic import ChessLogic
+from logic.engine import Engine
+from logic.transposition import TranspositionTable, EXACT, LOWER, UPPER, BUCKET_BYTES
+
+def test_store_and_probe():
+    table = TranspositionTable(1)
+    key = ChessLogic().hash
+    assert table.probe(key) is None
+    table.store(key, 1234, -250, 5, LOWER)
+    assert table.probe(key) == (1234, -250, 5, LOWER)
+    assert table.hits == 1 and table.probes == 2
+    assert table.hit_rate == 0.5
+
+def test_size_budget():
+    table = TranspositionTable(1)
+    assert table.memory == 1 << 20
+    assert table.buckets == (1 << 20) // BUCKET_BYTES
+    # rounded down to a power of two number of buckets
+    assert TranspositionTable(1.5).memory == 1 << 20
+
+def test_replacement():
+    table = TranspositionTable(0.001)
+    # three keys in the same bucket
+    deep, shallow, newer = 1 << 40, 2 << 40, 3 << 40
+    table.store(deep, 1, 10, 8, EXACT)
+    table.store(shallow, 2, 20, 2, UPPER)
+    # the deep entry keeps its slot, the always-replace slot is overwritten
+    assert table.probe(deep) == (1, 10, 8, EXACT)
+    assert table.probe(shallow) == (2, 20, 2, UPPER)
+    table.store(newer, 3, 30, 1, EXACT)
+    assert table.probe(deep) is not None
+    assert table.probe(shallow) is None
+    # entries of an older search give way to shallower ones
+    table.new_search()
+    table.store(shallow, 2, 20, 2, UPPER)
+    assert table.probe(deep) is None
+    assert table.probe(shallow) == (2, 20, 2, UPPER)
+
+def test_external_buffer():
+    buffer = bytearray(4096)
+    table = TranspositionTable(buffer=buffer)
+    assert table.buckets == 4096 // BUCKET_BYTES
+    table.store(99, 7, 0, 3, EXACT)
+    # a second table over the same memory sees the entry
+    assert TranspositionTable(buffer=buffer).probe(99) == (7, 0, 3, EXACT)
+    table.clear()
+    assert table.probe(99) is None
+
+def test_engine_reuses_table():
+    table = TranspositionTable(4)
+    logic = ChessLogic.from_fen("r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1")
+    first = Engine(logic, table).search(depth=3)
+    assert table.hit_rate > 0 and table.usage() > 0
+    second = Engine(logic, table).search(depth=3)
+    assert second.move == first.move
+    assert second.nodes < first.nodes
@@ -466,4 +466,65 @@ def test_king_moves():
         ['','','x','x','x','','',''],
         ['','','','','','','',''],
         ['','','','','','','','']
-    ]
\ No newline at end of file
+    ]
+
+def test_lookup_tables():
+    from logic.tables import KNIGHT_TARGETS, KING_TARGETS, PAWN_ATTACKS, RAYS, BETWEEN
+    assert set(KNIGHT_TARGETS[0]) == {(1, 2), (2, 1)}
+    assert len(KNIGHT_TARGETS[4 * 8 + 3]) == 8
+    assert len(KING_TARGETS[63]) == 3
+    assert set(PAWN_ATTACKS['w'][6 * 8 + 0]) == {(5, 1)}
+    assert set(PAWN_ATTACKS['b'][1 * 8 + 4]) == {(2, 3), (2, 5)}
+    # rays are ordered outwards from the square, the first one goes towards row 0
+    assert RAYS[4 * 8 + 3][0] == ((3, 3), (2, 3), (1, 3), (0, 3))
+    assert RAYS[0][0] == ()
+    # a1 to h8 crosses the six squares of the long diagonal
+    assert bin(BETWEEN[56][7]).count("1") == 6
+    assert BETWEEN[56][6] == 0
+
+def test_knight_moves_captures_only_opponent():
+    from logic.board_utils import knight_moves
+    board = [['' for _ in range(8)] for _ in range(8)]
+    board[2][2] = 'p'
+    board[2][4] = 'P'
+    assert (2, 2) in knight_moves(board, 4, 3, 'w')
+    assert (2, 4) not in knight_moves(board, 4, 3, 'w')
+
+def test_check_and_pin_masks():
+    from logic.board_utils import check_and_pin_masks
+    board = [
+        ['', '', '', '', 'k', '', '', ''],
+        ['', '', '', '', 'r', '', '', ''],
+        ['', '', '', '', '', '', '', ''],
+        ['', '', '', '', '', '', '', ''],
+        ['', 'b', '', '', '', '', '', ''],
+        ['', '', '', '', 'R', '', '', ''],
+        ['', '', '', 'N', '', '', '', ''],
+        ['', '', '', '', 'K', '', '', ''],
+    ]
+    checkers, check_mask, pins = check_and_pin_masks(board, "e1", 'w')
+    assert checkers == 0
+    # the e3 rook may move along the e file up to the e7 rook, the d2 knight is pinned on the diagonal
+    assert pins[5 * 8 + 4] == sum(1 << (row * 8 + 4) for row in range(1, 7))
+    assert pins[6 * 8 + 3] == (1 << (6 * 8 + 3)) | (1 << (5 * 8 + 2)) | (1 << (4 * 8 + 1))
+
+    board[5][4] = ''
+    checkers, check_mask, pins = check_and_pin_masks(board, (7, 4), 'w')
+    assert checkers == 1
+    assert check_mask == sum(1 << (row * 8 + 4) for row in range(1, 7))
+
+def test_packed_moves():
+    from logic.board_utils import SQUARE_INDEX, pack_move, parse_move, move_name, str2index, index2str, get_piece
+    assert SQUARE_INDEX["a8"] == 0 and SQUARE_INDEX["h1"] == 63 and SQUARE_INDEX["e2"] == 52
+    assert str2index(52) == (6, 4)
+    assert index2str(52) == "e2"
+    assert get_piece(get_initial_board(), 60) == 'K'
+
+    move = parse_move("e2e4")
+    assert move == pack_move(52, 36)
+    assert move & 63 == 52 and move >> 6 & 63 == 36 and move >> 12 == 0
+    assert move_name(move) == "e2e4"
+    assert move_name(parse_move("e7e8=N")) == "e7e8n"
+    assert parse_move("b2a1q") == pack_move(49, 56, 'q')
+    # every move fits in 16 bits
+    assert parse_move("h2h1q") < 1 << 16
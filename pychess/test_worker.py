@@ -0,0 +1,59 @@
+import time
+
+from logic.chess_logic import ChessLogic
+from logic.worker import GameWorker
+
+def wait_for_states(worker, count, timeout=5.0):
+    states = []
+    deadline = time.perf_counter() + timeout
+    while len(states) < count and time.perf_counter() < deadline:
+        states.extend(worker.poll())
+        time.sleep(0.01)
+    return states
+
+def test_human_moves():
+    worker = GameWorker(ChessLogic())
+    worker.start()
+    worker.submit_move("e2e4")
+    worker.submit_move("e7e6")
+    worker.submit_move("e4e6")
+    states = wait_for_states(worker, 3)
+    worker.stop()
+    assert [state.notation for state in states] == ["e2e4", "e7e6", ""]
+    assert states[1].board[2][4] == 'p'
+    assert states[-1].turn == 'w'
+
+def test_engine_reply():
+    worker = GameWorker(ChessLogic(), engine_side='b', time_limit=0.2, table_mb=1)
+    worker.start()
+    # submitting and polling return at once while the engine thinks
+    start = time.perf_counter()
+    worker.submit_move("e2e4")
+    states = worker.poll()
+    assert time.perf_counter() - start < 0.05
+    states += wait_for_states(worker, 2 - len(states))
+    # a move for the engine's side is rejected
+    worker.submit_move("d7d5")
+    states += wait_for_states(worker, 1)
+    worker.stop()
+    assert states[0].move == "e2e4"
+    assert states[1].notation != ""
+    assert states[1].turn == 'w'
+    assert states[2].move == "d7d5" and states[2].notation == ""
+
+def test_engine_plays_white():
+    worker = GameWorker(ChessLogic(), engine_side='w', time_limit=0.1, table_mb=1)
+    worker.start()
+    states = wait_for_states(worker, 1)
+    worker.stop()
+    assert states[0].turn == 'b'
+
+def test_stop_cancels_search():
+    worker = GameWorker(ChessLogic(), engine_side='w', time_limit=60, table_mb=1)
+    worker.start()
+    time.sleep(0.1)
+    start = time.perf_counter()
+    worker.stop(timeout=5.0)
+    assert time.perf_counter() - start < 1.0
+    assert not worker._thread.is_alive()
+    assert worker.poll() == []